@@ -0,0 +1,86 @@
+"""
+Rows/sec of csv_to_bin, row by row (1 record or 1 buffer per write) vs vectorized,
+in this process or on 1 worker process per core
+Write syscalls are read from /proc/self/io on Linux, for this process only
+Usage:
+  python bench_csv_to_bin.py            # 1,000,000 LOBSTER message rows
+  python bench_csv_to_bin.py 5000000    # any number of rows
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Optional, Tuple
+
+from csv_to_bin import FieldSpec, csv_to_bin
+
+# Same layout as the example in csv_to_bin.py
+LOBSTER_FIELDS = [
+  FieldSpec("time",       "d", float),
+  FieldSpec("event_type", "b", int),
+  FieldSpec("order_id",   "q", int),
+  FieldSpec("size",       "i", int),
+  FieldSpec("price",      "i", int),
+  FieldSpec("direction",  "b", int),
+]
+
+
+# Writes rows LOBSTER message lines: time (seconds after midnight), event type, order id, size, price, direction
+def make_messages(path: str, rows: int, seed: int = 1) -> None:
+  rng = random.Random(seed)
+  t = 34200.0  # 9:30
+  with open(path, "w") as f:
+    for _ in range(rows):
+      t += rng.random() * 0.01
+      f.write(f"{t:.9f},{rng.randint(1, 5)},{rng.randint(1, 10 ** 9)},{rng.randint(1, 1000)},"
+              f"{rng.randint(10 ** 6, 2 * 10 ** 6)},{rng.choice((1, -1))}\n")
+
+
+# Number of write syscalls made by this process so far, None where /proc is not available
+def write_syscalls() -> Optional[int]:
+  try:
+    with open("/proc/self/io") as f:
+      return int(dict(line.split(": ") for line in f.read().splitlines())["syscw"])
+  except OSError:
+    return None
+
+
+# Returns (seconds, write syscalls) of func()
+def timed(func) -> Tuple[float, Optional[int]]:
+  writes = write_syscalls()
+  start = time.perf_counter()
+  func()
+  seconds = time.perf_counter() - start
+  return seconds, None if writes is None else write_syscalls() - writes
+
+
+def main(rows: int) -> None:
+  with tempfile.TemporaryDirectory() as temp:
+    csv_path = os.path.join(temp, "messages.csv")
+    make_messages(csv_path, rows)
+    print(f"{rows:,} rows, {os.path.getsize(csv_path) / 1e6:.1f} MB of CSV, {os.cpu_count()} cores")
+    outputs = {}
+    baseline = None
+    modes = [
+      # buffer_size below 1 record: pack and write every record on its own, as before buffering
+      ("1 record per write", {"buffer_size": 0}),
+      ("1 MiB per write", {}),
+      ("vectorized", {"vectorized": True}),
+      # workers=None: 1 process per core, their writes are not counted
+      ("parallel", {"workers": None}),
+      ("parallel vectorized", {"workers": None, "vectorized": True}),
+    ]
+    for name, options in modes:
+      bin_path = os.path.join(temp, name.replace(" ", "_") + ".bin")
+      seconds, writes = timed(lambda: csv_to_bin(csv_path, bin_path, LOBSTER_FIELDS, delimiter=",", **options))
+      baseline = baseline or seconds
+      print(f"{name:<20}{seconds:>8.2f} s{rows / seconds:>14,.0f} rows/s{baseline / seconds:>8.1f}x"
+            f"{writes if writes is not None else '?':>12} write syscalls")
+      with open(bin_path, "rb") as f:
+        outputs[name] = f.read()
+    print("byte identical:", len(set(outputs.values())) == 1)
+
+
+if __name__ == "__main__":
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,497 @@
+"""
+Offline benchmarks for iex.py
+[+] Runs a local stub server that answers every IEX url with a canned JSON
+    payload, so the numbers do not depend on the network or the live API
+[+] Usage:
+    python bench_iex.py            # run every benchmark
+    python bench_iex.py session    # run 1 benchmark by name
+[+] endpoints replays recorded responses through iex_transport, set
+    IEX_FIXTURES to replay a fixture directory of your own instead of
+    recording one from the stub server, and IEX_LATENCY to the seconds of
+    simulated latency per request
+[+] decoder also times the largest recorded body of each endpoint in
+    IEX_FIXTURES, e.g.: real batch and 5y chart responses
+"""
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import requests
+
+from iex import IEX, pick_decoder
+from iex_cache import endpoint_of
+from iex_frames import build_frame
+from iex_transport import RecordingTransport, ReplayTransport
+from jsonToPanda import DataReader
+
+QUOTE = {"symbol": "AAPL", "companyName": "Apple Inc.",
+         "primaryExchange": "Nasdaq Global Select", "sector": "Technology",
+         "open": 154.0, "close": 153.28, "high": 154.8, "low": 153.25,
+         "latestPrice": 158.73, "latestVolume": 20567140,
+         "previousClose": 158.28, "change": -1.67, "changePercent": -0.01158}
+
+
+def make_chart(days):
+    """Daily bars shaped like GET /stock/{symbol}/chart/5y"""
+    rng = random.Random(days)
+    day = datetime.date(2014, 1, 2)
+    close = 100.0
+    bars = []
+    while len(bars) < days:
+        day += datetime.timedelta(days=1)
+        if day.weekday() >= 5:
+            continue
+        change = round(rng.gauss(0, 1), 2)
+        close = round(close + change, 2)
+        volume = rng.randint(10 ** 6, 10 ** 8)
+        bars.append({
+            "date": day.isoformat(), "open": close - change,
+            "high": close + 1.2, "low": close - 1.3, "close": close,
+            "volume": volume, "unadjustedVolume": volume,
+            "change": change, "changePercent": round(change / close, 4),
+            "vwap": round(close - change / 2, 4),
+            "label": day.strftime("%b %d, %y"),
+            "changeOverTime": round(close / 100 - 1, 6)})
+    return bars
+
+
+def make_minutes(minutes=390):
+    """Minute bars shaped like GET /stock/{symbol}/chart/1d"""
+    rng = random.Random(minutes)
+    price = 150.0
+    bars = []
+    for i in range(minutes):
+        hour, minute = divmod(9 * 60 + 30 + i, 60)
+        price = round(price + rng.gauss(0, 0.05), 3)
+        volume = rng.randint(100, 10000)
+        bars.append({
+            "date": "20181101", "minute": f"{hour:02d}:{minute:02d}",
+            "label": f"{hour % 12 or 12}:{minute:02d} {'AP'[hour >= 12]}M",
+            "high": price + 0.1, "low": price - 0.1, "average": price,
+            "volume": volume, "notional": round(price * volume, 3),
+            "numberOfTrades": volume // 100, "marketHigh": price + 0.1,
+            "marketLow": price - 0.1, "marketAverage": price,
+            "marketVolume": volume * 10,
+            "marketNotional": round(price * volume * 10, 3),
+            "marketNumberOfTrades": volume // 10, "open": price - 0.02,
+            "close": price, "marketOpen": price - 0.02, "marketClose": price,
+            "changeOverTime": round(price / 150 - 1, 6),
+            "marketChangeOverTime": round(price / 150 - 1, 6)})
+    return bars
+
+
+def make_routes():
+    """Payloads of every endpoint used by IEX and DataReader, for AAPL"""
+    chart = make_chart(21)
+    previous = {key: chart[-1][key] for key in
+                ["date", "open", "high", "low", "close", "volume",
+                 "unadjustedVolume", "change", "changePercent", "vwap"]}
+    previous["symbol"] = "AAPL"
+    ohlc = {"open": {"price": 154.0, "time": 1506605400394},
+            "close": {"price": 153.28, "time": 1506605400394},
+            "high": 154.8, "low": 153.25}
+    news = [{"datetime": "2018-11-01T09:30:00-04:00",
+             "headline": f"Headline {i}", "source": "IEX",
+             "url": f"https://example.com/{i}", "summary": "Summary",
+             "related": "AAPL"} for i in range(10)]
+    trades = [{"price": 186.39, "size": 10000 + i, "time": 1527090690175 + i,
+               "timeLabel": "11:51:30", "venue": "EDGX",
+               "venueName": "Cboe EDGX"} for i in range(20)]
+    venues = [{"volume": 200000 + i, "venue": f"V{i}", "venueName": f"V {i}",
+               "date": "2018-11-01", "marketPercent": 0.01 * i,
+               "avgMarketPercent": 0.01 * i} for i in range(12)]
+    quotes = [dict(QUOTE, symbol=f"S{i}") for i in range(10)]
+    base = "/1.0/stock/AAPL"
+    return {
+        base + "/batch": {"quote": QUOTE, "news": news[:1], "chart": chart},
+        base + "/book": {"quote": QUOTE, "bids": [], "asks": [],
+                         "systemEvent": {"systemEvent": "R"}},
+        base + "/chart": chart,
+        base + "/chart/5y": make_chart(1260),
+        base + "/chart/1d": make_minutes(),
+        base + "/company": {"symbol": "AAPL", "companyName": "Apple Inc.",
+                            "exchange": "Nasdaq Global Select",
+                            "industry": "Computer Hardware",
+                            "sector": "Technology", "issueType": "cs"},
+        base + "/delayed-quote": {"symbol": "AAPL", "delayedPrice": 143.08,
+                                  "delayedSize": 200,
+                                  "delayedPriceTime": 1498762739791},
+        base + "/dividends": [{"exDate": f"{year}-02-09", "amount": 0.63,
+                               "type": "Dividend income", "qualified": "Q",
+                               "flag": "", "indicated": ""}
+                              for year in range(2014, 2019)],
+        base + "/earnings": {"symbol": "AAPL", "earnings": [
+            {"actualEPS": 2.1, "consensusEPS": 2.02, "numberOfEstimates": 14,
+             "fiscalPeriod": f"Q{q} 2018"} for q in range(1, 5)]},
+        base + "/effective-spread": [{"volume": 4899, "venue": "XCHI",
+                                      "venueName": "CHX",
+                                      "effectiveSpread": 0.02,
+                                      "effectiveQuoted": 0.93,
+                                      "priceImprovement": 0.001}] * 8,
+        base + "/financials": {"symbol": "AAPL", "financials": [
+            {"reportDate": f"2018-0{q}-30", "grossProfit": 9894000000,
+             "totalRevenue": 22834000000, "netIncome": 3712000000}
+            for q in range(3, 7)]},
+        base + "/stats": {"companyName": "Apple Inc.", "marketcap": 9e11,
+                          "beta": 1.2, "week52high": 233.47,
+                          "week52low": 150.24, "symbol": "AAPL"},
+        base + "/largest-trades": trades,
+        base + "/logo": {"url": "https://example.com/aapl.png"},
+        base + "/news": news,
+        base + "/ohlc": ohlc,
+        base + "/peers": ["MSFT", "NOKIA", "IBM", "BBRY", "HPQ", "GOOGL"],
+        base + "/previous": previous,
+        base + "/price": 158.73,
+        base + "/quote": QUOTE,
+        base + "/relevant": {"peers": True, "symbols": ["MSFT", "IBM"]},
+        base + "/splits": [{"exDate": "2014-06-09", "ratio": 0.142857,
+                            "toFactor": 7, "forFactor": 1}],
+        base + "/volume-by-venue": venues,
+        "/1.0/stock/aapl/time-series": chart,
+        "/1.0/stock/market/batch": {"AAPL": {"quote": QUOTE, "news": news,
+                                             "chart": chart}},
+        "/1.0/stock/market/crypto": quotes,
+        "/1.0/stock/market/list/": quotes,
+        "/1.0/stock/market/news": news,
+        "/1.0/stock/market/ohlc": {quote["symbol"]: ohlc
+                                   for quote in quotes},
+        "/1.0/stock/market/previous": {quote["symbol"]: previous
+                                       for quote in quotes},
+        "/1.0/stock/market/sector-performance": [
+            {"type": "sector", "name": "Industrials",
+             "performance": 0.00711, "lastUpdated": 1533672000437}] * 11,
+        "/1.0/stock/market/today-earnings": {"bto": [], "amc": []},
+        "/1.0/stock/market/today-ipos": {"rawData": [], "viewData": []},
+        "/1.0/stock/market/upcoming-ipos": {"rawData": [], "viewData": []},
+    }
+
+
+# (name, call) of every IEX.get_* and DataReader method with a url, called
+# with an IEX or a DataReader for AAPL
+IEX_CALLS = [
+    ("get_single_batch", lambda api: api.get_single_batch()),
+    ("get_batch", lambda api: api.get_batch()),
+    ("get_book", lambda api: api.get_book()),
+    ("get_charts 1m", lambda api: api.get_charts("1m")),
+    ("get_charts 5y", lambda api: api.get_charts("5y")),
+    ("get_charts 1d", lambda api: api.get_charts("1d")),
+    ("get_company", lambda api: api.get_company()),
+    ("get_crypto", lambda api: api.get_crypto()),
+    ("get_delayedQuote", lambda api: api.get_delayedQuote()),
+    ("get_dividends", lambda api: api.get_dividends("5y")),
+    ("get_earnings", lambda api: api.get_earnings()),
+    ("get_earningsToday", lambda api: api.get_earningsToday()),
+    ("get_effectiveSpread", lambda api: api.get_effectiveSpread()),
+    ("get_financials", lambda api: api.get_financials()),
+    ("get_upcomingIpos", lambda api: api.get_upcomingIpos()),
+    ("get_todayIpos", lambda api: api.get_todayIpos()),
+    ("get_stats", lambda api: api.get_stats()),
+    ("get_largestTrades", lambda api: api.get_largestTrades()),
+    ("get_topTen", lambda api: api.get_topTen("mostactive")),
+    ("get_logo", lambda api: api.get_logo()),
+    ("get_batchNews", lambda api: api.get_batchNews()),
+    ("get_news", lambda api: api.get_news()),
+    ("get_batchOHLC", lambda api: api.get_batchOHLC()),
+    ("get_OHLC", lambda api: api.get_OHLC()),
+    ("get_rivals", lambda api: api.get_rivals()),
+    ("get_batchPrevious", lambda api: api.get_batchPrevious()),
+    ("get_previous", lambda api: api.get_previous()),
+    ("get_price", lambda api: api.get_price()),
+    ("get_quote", lambda api: api.get_quote()),
+    ("get_relevant", lambda api: api.get_relevant()),
+    ("get_sectorP", lambda api: api.get_sectorP()),
+    ("get_splits", lambda api: api.get_splits("5y")),
+    ("get_timeSeries", lambda api: api.get_timeSeries()),
+    ("get_volByVenue", lambda api: api.get_volByVenue()),
+]
+READER_CALLS = [
+    ("book", lambda reader: reader.book("quote")),
+    ("chart 1m", lambda reader: reader.chart("close", "1m")),
+    ("chart 5y columns", lambda reader: reader.chart(
+        columns=["date", "open", "close", "volume"], period="5y")),
+    ("chart 1d", lambda reader: reader.chart("average", "1d")),
+    ("dividends", lambda reader: reader.dividends("5y")),
+    ("financials", lambda reader: reader.financials()),
+    ("topTen", lambda reader: reader.topTen("mostactive")),
+    ("news", lambda reader: reader.news()),
+    ("batchNews", lambda reader: reader.batchNews()),
+    ("quote", lambda reader: reader.quote()),
+    ("company", lambda reader: reader.company()),
+    ("earnings", lambda reader: reader.earnings()),
+    ("stats", lambda reader: reader.stats()),
+    ("largestTrades", lambda reader: reader.largestTrades()),
+    ("volByVenue", lambda reader: reader.volByVenue()),
+]
+
+
+def record_fixtures(root):
+    """Record 1 response per call of IEX_CALLS and READER_CALLS into root"""
+    with StubServer(make_routes()) as server:
+        recorder = RecordingTransport(root)
+        reader = DataReader("aapl")
+        reader.stock_api = IEX("aapl", transport=recorder)
+        reader.stock_api.prefix = server.prefix
+        for _, call in IEX_CALLS:
+            call(reader.stock_api)
+        for _, call in READER_CALLS:
+            call(reader)
+        recorder.close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer every GET with the payload registered for the longest prefix"""
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out separately
+
+    def do_GET(self):
+        body = self.server.payload_for(self.path)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Local stand-in for api.iextrading.com
+    >>> with StubServer({"/1.0/stock/AAPL/quote": QUOTE}) as server:
+    ...     api = IEX("aapl")
+    ...     api.prefix = server.prefix
+    """
+    daemon_threads = True
+
+    def __init__(self, routes=None):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.routes = {}
+        for path, payload in (routes or {}).items():
+            self.route(path, payload)
+        self.prefix = f"http://127.0.0.1:{self.server_address[1]}/1.0"
+
+    def route(self, path, payload):
+        """payload is encoded once, so the server cost stays flat"""
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode()
+        self.routes[path] = payload
+
+    def payload_for(self, path):
+        matches = [p for p in self.routes if path.startswith(p)]
+        if not matches:
+            return b"{}"
+        return self.routes[max(matches, key=len)]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+def timeit(func, number):
+    """Return mean seconds per call after 1 warm up call"""
+    func()
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) / number
+
+
+def report(name, seconds, baseline=None):
+    line = f"{name:<40}{seconds * 1e3:>10.3f} ms/call"
+    if baseline:
+        line += f"{baseline / seconds:>8.1f}x"
+    print(line)
+
+
+def bench_session(number=500):
+    """Per call latency of get_quote, fresh connection vs pooled session"""
+    with StubServer({"/1.0/stock/AAPL/quote": QUOTE}) as server:
+        url = server.prefix + "/stock/AAPL/quote"
+        # what get_data did before: module level requests.get per call
+        fresh = timeit(lambda: json.loads(requests.get(url).text), number)
+        with IEX("aapl") as api:
+            api.prefix = server.prefix
+            pooled = timeit(api.get_quote, number)
+    report("requests.get (new connection)", fresh)
+    report("IEX.get_quote (pooled session)", pooled, fresh)
+
+
+def bench_chart_columns(number=20):
+    """4 chart columns of a 5y chart, joinCol of chart calls vs columns="""
+    names = ["date", "open", "close", "volume"]
+    with StubServer({"/1.0/stock/AAPL/chart": make_chart(1260)}) as server:
+        reader = DataReader("aapl")
+        reader.stock_api.prefix = server.prefix
+        joined = timeit(lambda: reader.joinCol(
+            *[reader.chart(name, "5y") for name in names]), number)
+        projected = timeit(
+            lambda: reader.chart(columns=names, period="5y"), number)
+    report("joinCol(chart(...) x 4)", joined)
+    report("chart(columns=[...])", projected, joined)
+
+
+def recorded_payloads(root):
+    """
+    Return {"recorded ENDPOINT": body} of the largest JSON body recorded
+    per endpoint in the fixture directory root, refer to RecordingTransport
+    """
+    largest = {}
+    for name in os.listdir(root):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(root, name)) as f:
+            meta = json.load(f)
+        content_type = meta["headers"].get("Content-Type", "json")
+        if meta["status"] // 100 != 2 or "json" not in content_type:
+            continue
+        with open(os.path.join(root, name[:-5] + ".body"), "rb") as f:
+            body = f.read()
+        label = f"recorded {endpoint_of(meta['url'])}"
+        if len(body) > len(largest.get(label, b"")):
+            largest[label] = body
+    return dict(sorted(largest.items()))
+
+
+def bench_decoder(number=50):
+    """JSON decode of chart and batch payloads, str + json vs bytes"""
+    payloads = {
+        "5y chart": json.dumps(make_chart(1260)).encode(),
+        "batch x100 1m chart": json.dumps(
+            {f"S{i}": {"quote": QUOTE, "chart": make_chart(21)}
+             for i in range(100)}).encode(),
+    }
+    root = os.environ.get("IEX_FIXTURES")
+    if root is not None:
+        payloads.update(recorded_payloads(root))
+    decoders = {"json.loads(bytes)": json.loads}
+    for module in ["ujson", "orjson"]:
+        try:
+            decoders[f"{module}.loads(bytes)"] = __import__(module).loads
+        except ImportError:
+            print(f"{module} is not installed, skipped")
+    for name, body in payloads.items():
+        print(f"{name}: {len(body) / 1e6:.2f} MB")
+        # what get_data + json.loads did before: decode to str then parse
+        text = timeit(lambda: json.loads(body.decode("utf-8")), number)
+        report("  json.loads(body.decode())", text)
+        for decoder_name, decoder in decoders.items():
+            report(f"  {decoder_name}",
+                   timeit(lambda: decoder(body), number), text)
+    print(f"pick_decoder() -> {pick_decoder().__module__}")
+
+
+def bench_frames(number=50):
+    """DataFrame build of chart payloads, json_normalize vs build_frame"""
+    charts = {"5y daily chart": make_chart(1260),
+              "1d minute chart": make_minutes(390)}
+    for name, bars in charts.items():
+        print(f"{name}: {len(bars)} bars")
+        normalized = timeit(lambda: pd.DataFrame(pd.json_normalize(bars)),
+                            number)
+        report("  pd.DataFrame(pd.json_normalize(...))", normalized)
+        report("  build_frame(..., 'chart')",
+               timeit(lambda: build_frame(bars, "chart"), number), normalized)
+
+
+def bench_memory(symbols=20):
+    """Memory of a 5y chart of 20 symbols, default vs typed frames"""
+    batch = {f"S{i}": {"chart": make_chart(1260)} for i in range(symbols)}
+    with StubServer({"/1.0/stock/market/batch": batch}) as server:
+        readers = {"default": DataReader(*batch),
+                   "typed": DataReader(*batch, typed=True),
+                   "typed + downcast": DataReader(*batch, typed=True,
+                                                  downcast=True)}
+        baseline = None
+        for name, reader in readers.items():
+            reader.stock_api.prefix = server.prefix
+            df = reader.chart(columns=["date", "label", "open", "high",
+                                       "low", "close", "volume"],
+                              period="5y")
+            size = df.memory_usage(deep=True).sum()
+            baseline = baseline or size
+            print(f"{name:<40}{size / 1e6:>10.2f} MB{baseline / size:>8.1f}x")
+        print(df.dtypes.to_string())
+
+
+def bench_endpoints(number=20):
+    """Every IEX.get_* and DataReader method, replayed from fixtures"""
+    latency = float(os.environ.get("IEX_LATENCY", 0))
+    root = os.environ.get("IEX_FIXTURES")
+    with tempfile.TemporaryDirectory() as temp:
+        if root is None:
+            root = temp
+            record_fixtures(root)
+        replay = ReplayTransport(root, latency=latency)
+        reader = DataReader("aapl")
+        reader.stock_api = IEX("aapl", transport=replay)
+        print(f"fixtures: {root}, latency: {latency * 1e3:.1f} ms")
+        for name, call in IEX_CALLS:
+            report(f"IEX.{name}",
+                   timeit(lambda: call(reader.stock_api), number))
+        for name, call in READER_CALLS:
+            report(f"DataReader.{name}", timeit(lambda: call(reader), number))
+
+
+# statements timed by bench_import, pandas alone as a reference
+IMPORTS = ["import iex", "import jsonToPanda",
+           "from iex import IEX; IEX('aapl')", "import pandas"]
+
+
+def import_time(statement):
+    """
+    Return (microseconds, heavy modules loaded) of statement in a fresh
+    interpreter, from the top level entries of python -X importtime
+    """
+    check = "; import sys; print(sorted({'pandas', 'numpy', 'requests'}" \
+        " & set(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement + check],
+        capture_output=True, text=True, check=True)
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name[1:].startswith(" "):  # nested imports are indented
+            total += int(cumulative)
+    return total, result.stdout.strip()
+
+
+def bench_import(number=5):
+    """Import time of iex.py and jsonToPanda.py, python -X importtime"""
+    startup = min(import_time("pass")[0] for _ in range(number))
+    for statement in IMPORTS:
+        runs = [import_time(statement) for _ in range(number)]
+        micros = min(micros for micros, _ in runs) - startup
+        print(f"{statement:<40}{micros / 1e3:>10.1f} ms  "
+              f"loads {runs[0][1]}")
+
+
+BENCHMARKS = {
+    "session": bench_session,
+    "chart_columns": bench_chart_columns,
+    "decoder": bench_decoder,
+    "frames": bench_frames,
+    "memory": bench_memory,
+    "endpoints": bench_endpoints,
+    "import": bench_import,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f"[{name}] {BENCHMARKS[name].__doc__}")
+        BENCHMARKS[name]()
@@ -0,0 +1,180 @@
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+import json
+import mmap  # Maps the file into memory: pages are read by the OS on first access, nothing is copied into Python
+import os
+
+import numpy as np
+
+from csv_to_bin import (FieldSpec, NUMPY_FORMATS, build_dtype, build_struct, HEADER_MAGIC, HEADER_VERSION, HEADER_ALIGN,
+                        HEADER_STRUCT, HEADER_UNKNOWN_COUNT)
+
+
+# Contents of the header written by csv_to_bin(header=True), see pack_header for the layout
+@dataclass
+class BinHeader:
+  version: int
+  fields: List[FieldSpec]  # parsers are int or float from the format, only used if the fields are fed back to csv_to_bin
+  record_size: int
+  record_count: int
+  data_offset: int  # bytes before the first record, a multiple of HEADER_ALIGN
+
+
+# Reads and checks the header at the start of file_in, returns None if the file has none (written without header=True).
+# Raises ValueError if the header cannot be trusted: unknown version or byte order, schema not matching the record size,
+# conversion that did not finish, or a file size other than data offset + record count * record size.
+def read_header(file_in: BinaryIO, bin_path: str) -> Optional[BinHeader]:
+  size = os.fstat(file_in.fileno()).st_size
+  file_in.seek(0)
+  fixed = file_in.read(HEADER_STRUCT.size)
+  if len(fixed) < HEADER_STRUCT.size or not fixed.startswith(HEADER_MAGIC):
+    return None
+  _, version, byteorder, record_size, schema_size, record_count, data_offset = HEADER_STRUCT.unpack(fixed)
+  if version > HEADER_VERSION:
+    raise ValueError(f"{bin_path}: header version {version} is newer than the supported version {HEADER_VERSION}")
+  if byteorder != b"<":
+    raise ValueError(f"{bin_path}: byte order {byteorder!r} is not supported, only little-endian ('<') records are")
+
+  try:
+    schema = json.loads(file_in.read(schema_size).decode("utf-8"))
+    fields = [FieldSpec(f["name"], f["format"], float if f["format"] in "fd" else int) for f in schema["fields"]]
+  except (ValueError, KeyError, TypeError) as e:
+    raise ValueError(f"{bin_path}: unreadable header schema: {e}") from e
+  unsupported = [f.format for f in fields if f.format not in NUMPY_FORMATS]
+  if unsupported:
+    raise ValueError(f"{bin_path}: formats {unsupported} cannot be read as NumPy arrays")
+  if build_struct(fields).size != record_size:
+    raise ValueError(f"{bin_path}: fields make {build_struct(fields).size} byte records, header says {record_size}")
+  if data_offset % HEADER_ALIGN or data_offset < HEADER_STRUCT.size + schema_size:
+    raise ValueError(f"{bin_path}: bad data offset {data_offset}")
+  if record_count == HEADER_UNKNOWN_COUNT:
+    raise ValueError(f"{bin_path}: no record count in the header, the conversion did not finish")
+  if size != data_offset + record_count * record_size:
+    raise ValueError(f"{bin_path}: size {size} does not match {record_count} records of {record_size} bytes after a "
+                     f"{data_offset} byte header, the file is truncated or has trailing data")
+  return BinHeader(version, fields, record_size, record_count, data_offset)
+
+
+# Returns (fields, data offset, record count) of bin_path, from its header if it has one, else from the given fields.
+# Fields given for a file with a header must match its schema (names and formats), so a wrong schema fails loudly.
+def resolve_layout(file_in: BinaryIO, bin_path: str, fields: Optional[List[FieldSpec]]) -> Tuple[List[FieldSpec], int, int]:
+  header = read_header(file_in, bin_path)
+  if header is not None:
+    if fields is not None and [(f.name, f.format) for f in fields] != [(f.name, f.format) for f in header.fields]:
+      raise ValueError(f"{bin_path}: fields {[(f.name, f.format) for f in fields]} do not match the header "
+                       f"{[(f.name, f.format) for f in header.fields]}")
+    return header.fields, header.data_offset, header.record_count
+  if fields is None:
+    raise ValueError(f"{bin_path}: no header, pass the fields the file was written with")
+  size = os.fstat(file_in.fileno()).st_size
+  record_size = build_struct(fields).size
+  # A size that is not a whole number of records means the fields do not match the file (or it was cut short)
+  if size % record_size:
+    raise ValueError(f"{bin_path}: size {size} is not a multiple of the record size {record_size}, fields do not match the file")
+  return fields, 0, size // record_size
+
+
+# Reads a .bin file written by csv_to_bin as a NumPy structured array backed by the mapped file, with no copy.
+# fields: the List[FieldSpec] the file was written with, the dtype comes from build_dtype, same layout as build_struct.
+# Optional for files with a header (csv_to_bin(header=True)), which are checked by read_header and against fields if given.
+# [+] reader[i] is record i (negative indexes count from the end), reader[i:j] and reader[mask] work as on any NumPy array
+# [+] slices and columns (reader["price"], reader.column("price")) are views into the mapping, not copies
+# [+] the array is read-only, writing to it raises ValueError
+# e.g.:
+# with BinReader("lobster_messages.bin", lobster_fields) as reader:
+#   prices = reader["price"]            # int32 view over the whole file
+#   first_hour = reader[:100_000]       # view of the first records
+#   for block in reader.blocks():       # sequential replay
+#     ...
+# with BinReader("lobster_messages.bin") as reader:  # written with header=True, fields come from the header
+#   ...
+class BinReader:
+  def __init__(self, bin_path: str, fields: Optional[List[FieldSpec]] = None):
+    self.bin_path = bin_path
+    self._mmap = None
+
+    with open(bin_path, "rb") as f:
+      self.fields, data_offset, record_count = resolve_layout(f, bin_path, fields)
+      self.dtype = build_dtype(self.fields)
+      # mmap cannot map an empty file, an empty array has the same interface
+      if record_count:
+        # The mapping stays valid after the file is closed
+        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # frombuffer over a read-only mapping: zero copy, and NumPy marks the array read-only.
+    # The header pads data_offset to a page, so the records start page-aligned.
+    if self._mmap is not None:
+      self.records = np.frombuffer(self._mmap, dtype=self.dtype, count=record_count, offset=data_offset)
+    else:
+      self.records = np.empty(0, dtype=self.dtype)
+
+  def __len__(self) -> int:
+    return len(self.records)
+
+  def __getitem__(self, key):
+    return self.records[key]
+
+  def __iter__(self) -> Iterator[np.void]:
+    return iter(self.records)
+
+  # View of one field over all records, strided over the mapping (not contiguous, np.ascontiguousarray copies it if needed)
+  def column(self, name: str) -> np.ndarray:
+    return self.records[name]
+
+  # Yields views of block_rows records at a time, in file order, for sequential replay.
+  # Tells the OS the mapping is read sequentially so it reads ahead and drops pages behind.
+  def blocks(self, block_rows: int = 1 << 16) -> Iterator[np.ndarray]:
+    if self._mmap is not None and hasattr(mmap, "MADV_SEQUENTIAL"):
+      self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+    for start in range(0, len(self.records), block_rows):
+      yield self.records[start:start + block_rows]
+
+  # Unmaps the file. Views handed out before still hold the mapping, it is then unmapped once the last one is gone.
+  def close(self) -> None:
+    self.records = np.empty(0, dtype=self.dtype)
+    if self._mmap is not None:
+      try:
+        self._mmap.close()
+      except BufferError:
+        pass
+      self._mmap = None
+
+  def __enter__(self) -> "BinReader":
+    return self
+
+  def __exit__(self, *exc_info) -> None:
+    self.close()
+
+
+# Streams a .bin file as structured arrays of up to block_rows records, read with plain reads instead of a mapping
+# (network filesystems, or to keep the page cache out of it). Same checks and fields rules as BinReader.
+# Each block is a new array, owned by the caller.
+def read_blocks(bin_path: str, fields: Optional[List[FieldSpec]] = None, block_rows: int = 1 << 16) -> Iterator[np.ndarray]:
+  with open(bin_path, "rb") as f:
+    fields, data_offset, record_count = resolve_layout(f, bin_path, fields)
+    dtype = build_dtype(fields)
+    f.seek(data_offset)
+    for start in range(0, record_count, block_rows):
+      block = np.empty(min(block_rows, record_count - start), dtype=dtype)
+      # readinto fills the array in place, no intermediate bytes object
+      read = f.readinto(memoryview(block).cast("B"))
+      if read != block.nbytes:
+        raise ValueError(f"{bin_path}: file shrank while reading, record {start + read // dtype.itemsize} is missing")
+      yield block
+
+
+if __name__ == "__main__":
+  # example, reads back the file written by the csv_to_bin example
+  lobster_fields = [
+    FieldSpec("time",         "d", float),
+    FieldSpec("event_type",   "b", int),
+    FieldSpec("order_id",     "q", int),
+    FieldSpec("size",         "i", int),
+    FieldSpec("price",        "i", int),
+    FieldSpec("direction",    "b", int),
+  ]
+  with BinReader("lobster_messages.bin", lobster_fields) as reader:
+    print(f"{len(reader):,} records of {reader.dtype.itemsize} bytes")
+    print("first:", reader[0])
+    print("last:", reader[-1])
+    print("mean price:", reader["price"].mean())
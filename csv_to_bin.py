@@ -1,7 +1,16 @@
 from dataclasses import dataclass
-from typing import Callable, Any, List, Optional, TextIO
+from typing import Callable, Any, Iterable, List, Optional, TextIO, BinaryIO, Tuple, TYPE_CHECKING
 import struct  # Used to turn each CSV row into a fixed-size binary record
 import csv
+import io
+import itertools
+import json
+import os
+import shutil
+import warnings
+
+if TYPE_CHECKING:
+  import numpy as np  # imported at run time by the vectorized path only, the row path needs the standard library alone
 
 
 @dataclass  # auto-generate __init__, __repr__, etc., for simple “data holder” classes, so you don’t write boilerplate.
@@ -22,6 +31,68 @@ def build_struct(fields: List[FieldSpec]) -> struct.Struct:
   return struct.Struct(format)
 
 
+# struct format char -> NumPy dtype of the same size, for the vectorized path.
+# "<" in build_struct means standard sizes, so "l"/"L" are 4 bytes here, not the platform long.
+# Only formats whose NumPy conversion matches parser + struct.pack bit for bit are listed ("?", "e", "s", ... are not).
+NUMPY_FORMATS = {
+  "b": "<i1", "B": "<u1", "h": "<i2", "H": "<u2", "i": "<i4", "I": "<u4",
+  "l": "<i4", "L": "<u4", "q": "<i8", "Q": "<u8", "f": "<f4", "d": "<f8",
+}
+
+
+# Function that takes a list of FieldSpec and returns the NumPy structured dtype of one record
+# Same layout as build_struct: "<" packs the fields back to back with no padding, and so does a structured dtype built from a list
+def build_dtype(fields: List[FieldSpec]) -> "np.dtype":
+  import numpy as np  # only the vectorized path and readers need NumPy
+  return np.dtype([(f.name, NUMPY_FORMATS[f.format]) for f in fields])
+
+
+# Returns the dtype loadtxt parses each column into before it is cast to the record dtype.
+# Parsing follows the parser, not the format: int("1.5") fails, so an int column must not be parsed as a float even if it is stored as "d".
+# None if a field cannot be vectorized (custom parser, float parser into an integer format, unlisted format).
+def parse_dtype(fields: List[FieldSpec]) -> Optional["np.dtype"]:
+  import numpy as np
+  columns = []
+  for f in fields:
+    if f.format not in NUMPY_FORMATS:
+      return None
+    if f.parser is int:
+      # uint64 values do not fit in int64, everything else does
+      columns.append((f.name, "<u8" if f.format == "Q" else "<i8"))
+    elif f.parser is float and f.format in ("f", "d"):
+      columns.append((f.name, "<f8"))
+    else:
+      return None
+  return np.dtype(columns)
+
+
+# Casts a block parsed with parse_dtype into the record dtype.
+# Returns None if any value would not pack the same way with struct (out of range integer, float32 overflow),
+# the caller then redoes the block row by row so struct raises the usual error.
+def cast_block(parsed: "np.ndarray", fields: List[FieldSpec], record_dtype: "np.dtype") -> Optional["np.ndarray"]:
+  import numpy as np
+  out = np.empty(len(parsed), dtype=record_dtype)
+  for f in fields:
+    values = parsed[f.name]
+    target = record_dtype[f.name]
+    if target.kind in "iu":
+      info = np.iinfo(target)
+      if len(values) and (values.min() < info.min or values.max() > info.max):
+        return None
+      out[f.name] = values
+    elif target.itemsize == 4:
+      # struct packs "f" as (float)double and raises OverflowError if a finite value rounds to inf
+      with np.errstate(over="ignore"):
+        narrow = values.astype(np.float64).astype(np.float32)
+      if np.any(np.isinf(narrow) & np.isfinite(values)):
+        return None
+      out[f.name] = narrow
+    else:
+      # int -> double rounds to nearest, same as struct.pack("<d", value)
+      out[f.name] = values
+  return out
+
+
 # Creates a csv.reader object for a given file
 def make_reader(file_in: TextIO, has_header: bool, delimiter: Optional[str]) -> csv.reader:
   if delimiter is None:
@@ -43,26 +114,70 @@ def make_reader(file_in: TextIO, has_header: bool, delimiter: Optional[str]) ->
   return reader
 
 
-def csv_to_bin(
-    csv_path: str,
-    bin_path: str,
+# Default size of the output buffer in bytes, records are packed into it and written once it is full
+BUFFER_SIZE = 1 << 20
+
+
+# Optional file header (header=True), so readers need no FieldSpec list to open a .bin file, see bin_reader.py.
+# Layout, little-endian:
+#   fixed part (HEADER_STRUCT): magic, version, byte order of the records ("<"), 1 pad byte, record size, schema size,
+#                               record count, data offset
+#   schema: schema size bytes of UTF-8 JSON, {"fields": [{"name": ..., "format": ...}, ...]}
+#   zero padding up to data offset, a multiple of HEADER_ALIGN, so the records start on a page boundary when mapped
+#   records: record count * record size bytes, same as without a header
+# The record count is written last, once every record is: a file whose conversion failed keeps HEADER_UNKNOWN_COUNT.
+HEADER_MAGIC = b"\x93CSV2BIN"
+HEADER_VERSION = 1
+HEADER_ALIGN = 4096
+HEADER_STRUCT = struct.Struct("<8sHcxIIQQ")
+HEADER_COUNT_OFFSET = struct.calcsize("<8sHcxII")  # where the record count sits in the fixed part
+HEADER_UNKNOWN_COUNT = 2 ** 64 - 1
+
+
+# Returns the header of a file of fields records, with the record count left unknown
+def pack_header(fields: List[FieldSpec]) -> bytes:
+  schema = json.dumps({"fields": [{"name": f.name, "format": f.format} for f in fields]}).encode("utf-8")
+  size = HEADER_STRUCT.size + len(schema)
+  data_offset = -(-size // HEADER_ALIGN) * HEADER_ALIGN  # rounded up to the next page
+  fixed = HEADER_STRUCT.pack(HEADER_MAGIC, HEADER_VERSION, b"<", build_struct(fields).size, len(schema),
+                             HEADER_UNKNOWN_COUNT, data_offset)
+  return (fixed + schema).ljust(data_offset, b"\0")
+
+
+# Writes the record count into the header at the start of file_out, from the size of the data written after it
+def finish_header(file_out: BinaryIO, fields: List[FieldSpec]) -> None:
+  data_offset = len(pack_header(fields))
+  size = file_out.seek(0, os.SEEK_END)
+  record_count = (size - data_offset) // build_struct(fields).size
+  file_out.seek(HEADER_COUNT_OFFSET)
+  file_out.write(struct.pack("<Q", record_count))
+  file_out.seek(0, os.SEEK_END)
+
+
+# Packs rows from a csv.reader (or any iterable of lists of strings) and writes them to file_out, one record per row.
+# start is the line number of the first row, so errors point at the right row when called on a block of a larger file.
+# Records are packed in place into a preallocated buffer of buffer_size bytes (rounded down to whole records, at least one),
+# which is written when full: 1 write per buffer instead of 1 write and 1 bytes object per record.
+def write_rows(
+    rows: Iterable[List[str]],
+    file_out: BinaryIO,
     fields: List[FieldSpec],
-    delimiter: Optional[str] = None,
-    has_header: Optional[bool] = False,
+    record_struct: struct.Struct,
+    csv_path: str,
+    start: int = 1,
+    buffer_size: int = BUFFER_SIZE,
 ) -> None:
-  # For each row, you’ll pack all parsed values using this object. Doing this once outside the loop is more efficient.
-  record_struct = build_struct(fields)
   # The number of CSV columns you expect (one per FieldSpec). Used for validation inside the loop to catch malformed rows.
   expected_columns = len(fields)
+  record_size = record_struct.size
+  # Preallocated once, pack_into writes each record straight into it, no per-row bytes allocation
+  buffer = bytearray(max(1, buffer_size // record_size) * record_size)
+  offset = 0  # bytes of buffer holding records not written yet
 
-  # Opens the CSV file for reading text ("r") and the binary file for writing ("wb"), using a context manager.
-  with open(csv_path, "r", newline="", encoding="utf-8") as file_in, open(bin_path, "wb") as file_out:
-    # Calls your make_reader helper to get a csv.reader configured
-    reader = make_reader(file_in, has_header, delimiter)
-
+  try:
     # Loops over each row from the CSV reader, giving you.
     # line_num is used in error messages so you can pinpoint where something went wrong
-    for line_num, row in enumerate(reader, start=1):
+    for line_num, row in enumerate(rows, start=start):
       # Skip completely empty or whitespace-only rows. Real-world CSVs often have blank lines; ignoring them avoids spurious errors.
       if not row or all(not cell.strip() for cell in row):
         continue
@@ -72,7 +187,7 @@ def csv_to_bin(
       # !r means “use repr(row)” – shows a more raw representation, good for debugging.
       if len(row) < expected_columns:
         raise ValueError(f"{csv_path}:{line_num}: expected at least {expected_columns} columns, got {len(row)}: {row!r}")
-      
+
       try:
         # Builds a list of parsed values. Converts raw CSV text into the correct Python types according to your schema, in a nice compact form.
         # zip(fields, row) pairs each FieldSpec with the corresponding string cell.
@@ -80,16 +195,272 @@ def csv_to_bin(
         values = [field.parser(val) for field, val in zip(fields, row)]
       except Exception as e:
         raise ValueError(f"{csv_path}:{line_num}: error parsing row {row!r}: {e}") from e
-      
+
       try:
-        # Packs all parsed values into a bytes object using the compiled Struct. This creates your fixed-size binary row, ideal for memory-mapped, sequential replay later.
+        # Packs all parsed values straight into the buffer at offset using the compiled Struct. This creates your fixed-size binary row, ideal for memory-mapped, sequential replay later.
         # *values unpacks the list so it becomes positional arguments.
-        packed = record_struct.pack(*values)
+        record_struct.pack_into(buffer, offset, *values)
       except struct.error as e:
         raise ValueError(f"{csv_path}:{line_num}: stuck.pack failed for values {values!r}: {e}") from e
-      
-      # Writes the packed bytes to the output file. Appends the record to the binary file. Each row in the CSV becomes one binary record.
-      file_out.write(packed)
+
+      # Each row in the CSV becomes one binary record. Once the buffer is full, write it to the output file in one call and start over.
+      offset += record_size
+      if offset == len(buffer):
+        file_out.write(buffer)
+        offset = 0
+  finally:
+    # Also on errors: the records before a bad row reach the file, as with 1 write per record
+    file_out.write(memoryview(buffer)[:offset])
+
+
+def csv_to_bin(
+    csv_path: str,
+    bin_path: str,
+    fields: List[FieldSpec],
+    delimiter: Optional[str] = None,
+    has_header: Optional[bool] = False,
+    vectorized: bool = False,
+    block_rows: int = 1 << 18,
+    buffer_size: int = BUFFER_SIZE,
+    workers: Optional[int] = 1,
+    header: bool = False,
+) -> None:
+  # vectorized=True parses block_rows lines at a time with NumPy and writes each block at once, see csv_to_bin_vectorized.
+  # buffer_size: bytes of records packed before each write, see write_rows.
+  # workers: processes converting chunks of the file in parallel, None for 1 per core, see csv_to_bin_parallel.
+  # header=True starts the file with the field names and formats and the record count, see pack_header.
+  if workers != 1:
+    csv_to_bin_parallel(csv_path, bin_path, fields, delimiter, has_header, workers,
+                        vectorized=vectorized, block_rows=block_rows, buffer_size=buffer_size, header=header)
+    return
+  if vectorized:
+    csv_to_bin_vectorized(csv_path, bin_path, fields, delimiter, has_header, block_rows, buffer_size, header)
+    return
+
+  # For each row, you’ll pack all parsed values using this object. Doing this once outside the loop is more efficient.
+  record_struct = build_struct(fields)
+
+  # Opens the CSV file for reading text ("r") and the binary file for writing ("wb"), using a context manager.
+  with open(csv_path, "r", newline="", encoding="utf-8") as file_in, open(bin_path, "wb") as file_out:
+    # Calls your make_reader helper to get a csv.reader configured
+    reader = make_reader(file_in, has_header, delimiter)
+    if header:
+      file_out.write(pack_header(fields))
+    write_rows(reader, file_out, fields, record_struct, csv_path, buffer_size=buffer_size)
+    if header:
+      finish_header(file_out, fields)
+
+
+# Same output as csv_to_bin, byte for byte, for files of millions of rows.
+# Each block of block_rows lines is parsed by np.loadtxt (C) into a structured array with the build_dtype layout,
+# then written with one tofile call, instead of 1 parser call per cell and 1 struct.pack per row.
+# Requires int or float parsers and a format in NUMPY_FORMATS for every field, raises ValueError otherwise.
+# Blocks NumPy cannot take as is (blank or short rows, values struct would reject, ...) go through write_rows,
+# so skipped rows and error messages, line numbers included, are the same as the row by row path.
+# Assumes 1 record per line: quoted fields must not contain line breaks.
+def csv_to_bin_vectorized(
+    csv_path: str,
+    bin_path: str,
+    fields: List[FieldSpec],
+    delimiter: Optional[str] = None,
+    has_header: Optional[bool] = False,
+    block_rows: int = 1 << 18,
+    buffer_size: int = BUFFER_SIZE,
+    header: bool = False,
+) -> None:
+  check_vectorized(fields)
+
+  with open(csv_path, "r", newline="", encoding="utf-8") as file_in, open(bin_path, "wb") as file_out:
+    # make_reader sniffs the dialect (and rewinds) exactly like the row path, the reader itself is only used for fallback blocks
+    dialect = make_reader(file_in, False, delimiter).dialect
+    if has_header:
+      next(file_in, None)
+    if header:
+      file_out.write(pack_header(fields))
+    write_blocks(file_in, file_out, fields, dialect, csv_path, 1, block_rows, buffer_size)
+    if header:
+      finish_header(file_out, fields)
+
+
+# Raises ValueError if a field cannot go through the vectorized path
+def check_vectorized(fields: List[FieldSpec]) -> None:
+  if parse_dtype(fields) is None:
+    unsupported = [f.name for f in fields if parse_dtype([f]) is None]
+    raise ValueError(f"fields {unsupported} need int/float parsers and a format in {''.join(NUMPY_FORMATS)} for vectorized mode")
+
+
+# The loop of csv_to_bin_vectorized: converts the lines of file_in, block_rows at a time, into file_out.
+# start is the line number of the first line of file_in, as counted by the row path.
+def write_blocks(
+    file_in: TextIO,
+    file_out: BinaryIO,
+    fields: List[FieldSpec],
+    dialect: csv.Dialect,
+    csv_path: str,
+    start: int = 1,
+    block_rows: int = 1 << 18,
+    buffer_size: int = BUFFER_SIZE,
+) -> None:
+  import numpy as np
+  parsing = parse_dtype(fields)
+  record_dtype = build_dtype(fields)
+  record_struct = build_struct(fields)
+
+  while True:
+    lines = list(itertools.islice(file_in, block_rows))
+    if not lines:
+      break
+    block = None
+    try:
+      # Warnings become errors: loadtxt warns instead of failing on e.g. an all blank block
+      with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        parsed = np.loadtxt(lines, dtype=parsing, delimiter=dialect.delimiter, quotechar=dialect.quotechar,
+                            comments=None, usecols=range(len(fields)), ndmin=1)
+      block = cast_block(parsed, fields, record_dtype)
+    except (ValueError, TypeError, Warning):
+      pass
+    if block is None:
+      # Row by row, raises the same error as the row path would, or writes the block if it was only blank rows
+      write_rows(csv.reader(lines, dialect), file_out, fields, record_struct, csv_path, start, buffer_size)
+    else:
+      block.tofile(file_out)
+    start += len(lines)
+
+
+# csv.Dialect attributes, enough to rebuild a sniffed dialect in a worker process (dialect objects do not pickle)
+DIALECT_ATTRS = ("delimiter", "quotechar", "escapechar", "doublequote", "skipinitialspace", "lineterminator", "quoting", "strict")
+
+
+# Splits csv_path from byte begin to the end into ranges [begin, end) of about chunk_bytes.
+# Each cut is moved forward to the end of the line it falls in, so every range holds whole lines.
+def split_ranges(csv_path: str, begin: int, chunk_bytes: int) -> List[Tuple[int, int]]:
+  size = os.path.getsize(csv_path)
+  ranges = []
+  with open(csv_path, "rb") as f:
+    while begin < size:
+      end = begin + chunk_bytes
+      if end < size:
+        f.seek(end)
+        f.readline()
+        end = f.tell()
+      else:
+        end = size
+      ranges.append((begin, end))
+      begin = end
+  return ranges
+
+
+# Worker of csv_to_bin_parallel: converts bytes [begin, end) of csv_path into segment_path, returns the number of lines of the range.
+# Errors carry line numbers counted from the start of the range, renumber_error turns them into line numbers of the whole file.
+def convert_range(
+    csv_path: str,
+    segment_path: str,
+    fields: List[FieldSpec],
+    dialect_attrs: dict,
+    begin: int,
+    end: int,
+    vectorized: bool,
+    block_rows: int,
+    buffer_size: int,
+) -> int:
+  with open(csv_path, "rb") as f:
+    f.seek(begin)
+    data = f.read(end - begin)
+  # The range ends at "\n", which never appears inside a multi-byte UTF-8 character, so it decodes on its own.
+  # newline="" keeps the line endings as they are, same as the file opened by csv_to_bin.
+  file_in = io.StringIO(data.decode("utf-8"), newline="")
+  reader = csv.reader(file_in, **dialect_attrs)
+  with open(segment_path, "wb") as file_out:
+    if vectorized:
+      write_blocks(file_in, file_out, fields, reader.dialect, csv_path, 1, block_rows, buffer_size)
+    else:
+      write_rows(reader, file_out, fields, build_struct(fields), csv_path, 1, buffer_size)
+  # Counted in memory, a last line without "\n" counts too
+  return data.count(b"\n") + (not data.endswith(b"\n"))
+
+
+# Returns error with the line number of its "csv_path:LINE: ..." message moved forward by lines_before,
+# the lines of the ranges before the one that raised it. Other errors are returned as they are.
+def renumber_error(error: BaseException, csv_path: str, lines_before: int) -> BaseException:
+  prefix = f"{csv_path}:"
+  message = str(error)
+  if isinstance(error, ValueError) and message.startswith(prefix):
+    line, _, rest = message[len(prefix):].partition(":")
+    if line.isdigit():
+      return ValueError(f"{prefix}{int(line) + lines_before}:{rest}")
+  return error
+
+
+# Same output as csv_to_bin, byte for byte, converted by several processes.
+# [+] The data lines are split into ranges of about chunk_bytes ending at line breaks, by default 4 ranges per worker
+#     (between 1 and 64 MiB each) so a slow range does not leave the other cores idle.
+# [+] Workers convert their ranges into segment files (bin_path.N.part), row by row or vectorized, in a single read
+#     of the input, and return the number of lines of their range.
+# [+] Segments are appended to bin_path in order as soon as they are done, then deleted.
+#     Record counts are only known once a range is converted (blank rows are skipped), so segments cannot be written in place ahead of time.
+# [+] The first bad row in file order raises the same ValueError as the row path, with the line number of the whole file
+#     (the lines of the ranges before it added to the line in its range), and bin_path holds the records before it.
+# Parsers must pickle (int, float, module level functions, not lambdas), and lines must end with "\n" or "\r\n"
+# with no line breaks inside quoted fields. On platforms that spawn processes, call it under if __name__ == "__main__".
+def csv_to_bin_parallel(
+    csv_path: str,
+    bin_path: str,
+    fields: List[FieldSpec],
+    delimiter: Optional[str] = None,
+    has_header: Optional[bool] = False,
+    workers: Optional[int] = None,
+    chunk_bytes: Optional[int] = None,
+    vectorized: bool = False,
+    block_rows: int = 1 << 18,
+    buffer_size: int = BUFFER_SIZE,
+    header: bool = False,
+) -> None:
+  from concurrent.futures import ProcessPoolExecutor
+  if vectorized:
+    check_vectorized(fields)
+
+  # Sniffed once here, every worker rebuilds the same dialect
+  with open(csv_path, "r", newline="", encoding="utf-8") as file_in:
+    dialect = make_reader(file_in, False, delimiter).dialect
+  dialect_attrs = {name: getattr(dialect, name) for name in DIALECT_ATTRS}
+  begin = 0
+  if has_header:
+    with open(csv_path, "rb") as f:
+      f.readline()
+      begin = f.tell()
+
+  if chunk_bytes is None:
+    size = os.path.getsize(csv_path) - begin
+    chunk_bytes = min(64 << 20, max(1 << 20, size // (4 * (workers or os.cpu_count() or 1))))
+  ranges = split_ranges(csv_path, begin, chunk_bytes)
+  segments = [f"{bin_path}.{i}.part" for i in range(len(ranges))]
+  try:
+    with ProcessPoolExecutor(workers) as pool, open(bin_path, "wb") as file_out:
+      if header:
+        file_out.write(pack_header(fields))
+      futures = [pool.submit(convert_range, csv_path, segment, fields, dialect_attrs, begin, end,
+                             vectorized, block_rows, buffer_size)
+                 for segment, (begin, end) in zip(segments, ranges)]
+      lines_before = 0
+      for future, segment in zip(futures, segments):
+        error = future.exception()
+        # A failed range still wrote the records before its bad row
+        if os.path.exists(segment):
+          with open(segment, "rb") as part:
+            shutil.copyfileobj(part, file_out, 1 << 24)
+          os.remove(segment)
+        if error is not None:
+          for pending in futures:
+            pending.cancel()
+          raise renumber_error(error, csv_path, lines_before)
+        lines_before += future.result()
+      if header:
+        finish_header(file_out, fields)
+  finally:
+    for segment in segments:
+      if os.path.exists(segment):
+        os.remove(segment)
 
 
 if __name__ == "__main__":
@@ -3,9 +3,118 @@ IEX API data
 __version__ 0.4
 """
 import json  # required to convert string to python object
-import requests
-import pandas as pd
-from pandas.io.json import json_normalize
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+# requests and pandas (through iex_frames) are imported on first use,
+# importing this module stays cheap for scripts that only need raw JSON
+from iex_cache import SingleFlight, endpoint_of
+from iex_scheduler import lane_for
+from iex_transport import HTTPTransport
+
+
+def make_session(pool_size=10, max_retries=3, backoff_factor=0.3,
+                 status_forcelist=(502, 503, 504)):
+    """
+    Build a requests.Session with a keep-alive connection pool
+    [+] pool_size: number of connections kept open per host, calls beyond
+        this block until a connection is free
+    [+] max_retries: retries on connection errors and status_forcelist
+        responses
+    [+] backoff_factor: sleep between retries, grows as
+        backoff_factor * 2 ** (retry number - 1)
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    retry = Retry(total=max_retries, backoff_factor=backoff_factor,
+                  status_forcelist=status_forcelist,
+                  respect_retry_after_header=bool(status_forcelist),
+                  allowed_methods=frozenset(["GET"]),
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry, pool_block=True)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def pick_decoder():
+    """
+    Return the fastest installed JSON decoder that parses bytes directly
+    orjson first, then ujson, then the standard library json
+    """
+    try:
+        import orjson
+        return orjson.loads
+    except ImportError:
+        pass
+    try:
+        import ujson
+        return ujson.loads
+    except ImportError:
+        return json.loads
+
+
+def multi_symbol(batch_type=None, key=None, batch_args=None):
+    """
+    Let a single symbol get_* method accept multiple symbols
+    [+] Single symbol calls run the method as is
+    [+] Multi symbol calls return {symbol: data}, data being what the
+        method returns for that symbol alone
+    [+] batch_type: type name in /stock/market/batch, all symbols are then
+        fetched with get_batch in as few requests as possible
+    [+] key: key to take out of each batch result, same as the method does
+        e.g.: "earnings" for get_earnings
+    [+] batch_args: function taking the method's arguments and returning
+        get_batch keyword arguments, or None when the arguments can not be
+        expressed as a batch. By default only calls without arguments are
+        batched
+    [+] Calls that can not be batched fall back to concurrent single symbol
+        calls
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            symbols = self.symbols.split(",")
+            if len(symbols) == 1:
+                return method(self, *args, **kwargs)
+            options = None
+            if batch_type is not None:
+                if batch_args is not None:
+                    options = batch_args(*args, **kwargs)
+                elif not args and not kwargs:
+                    options = {}
+            if options is None:
+                results = self.map_concurrent(
+                    lambda symbol: method(self.spawn(symbol), *args, **kwargs),
+                    symbols)
+                return dict(zip(symbols, results))
+            data = self.get_batch(types=batch_type, **options)
+            results = {}
+            for symbol in symbols:
+                value = data.get(symbol, {}).get(batch_type)
+                if key is not None and value is not None:
+                    value = value[key]
+                results[symbol] = value
+            return results
+        return wrapper
+    return decorator
+
+
+PERIOD_RANGE = ["5y", "2y", "1y", "ytd", "6m", "3m", "1m", "1d"]
+
+
+def _range_args(period=None, parameter=None):
+    """Batch arguments of get_charts, get_dividends and get_splits"""
+    if parameter is not None:
+        return None
+    if period is None:
+        return {}
+    if period in PERIOD_RANGE:
+        return {"period": period}
+    return None
 
 
 class IEX:
@@ -25,20 +134,197 @@ class IEX:
         [-] JSON sample are included for easy development purposes
     [+] This API does not require additional APIs to run, however, data reading
         will be a chore.
+    [+] Methods decorated with multi_symbol accept multiple symbols and
+        return the data as a dict keyed by symbol
     """
 
-    def __init__(self, *symbols):
+    def __init__(self, *symbols, session=None, timeout=10, pool_size=10,
+                 max_retries=3, cache=None, validators=None, flights=None,
+                 decoder=None, scheduler=None, dispatcher=None, lane=None,
+                 transport=None, metrics=None):
+        """
+        symbols: 1 or more stock symbols, e.g.: "aapl", "goog"
+        session: requests.Session to share between IEX instances,
+                 a pooled session is created if not given
+        timeout: seconds to wait for the server before giving up
+        pool_size, max_retries: refer to make_session
+        [+] pool_size is also the number of threads used by calls that fan
+            out into several requests, e.g.: get_batch
+        cache: response cache from iex_cache, e.g.: MemoryCache(),
+               SQLiteCache(path), nothing is cached if not given
+        validators: iex_cache.ValidatorStore, turns on conditional requests
+                    for get_json, useful when polling the same urls
+        flights: iex_cache.SingleFlight shared with other IEX instances,
+                 identical requests in flight at the same time are sent once
+        decoder: function parsing a JSON response body (bytes) into python
+                 objects, defaults to pick_decoder()
+        scheduler: iex_scheduler.Scheduler, rate limits requests and retries
+                   429/5xx responses and connection errors with backoff. The
+                   session made here then does not retry at all, max_retries
+                   is ignored, set the scheduler's instead
+        dispatcher: iex_scheduler.PriorityDispatcher shared by interactive
+                    and bulk clients, requests then wait for a worker of
+                    their lane
+        lane: dispatcher lane of every request of this client, e.g.: "bulk"
+              for backfills, defaults to iex_scheduler.lane_for(url)
+        transport: sends the requests, refer to iex_transport, e.g.:
+                   ReplayTransport(fixtures) to run without the network,
+                   defaults to HTTPTransport(session)
+        metrics: iex_metrics.Metrics, records request time, response size
+                 and decode time per endpoint
+        """
         self.prefix = "https://api.iextrading.com/1.0"
         self.symbols = self.get_symbols(*symbols)
+        if session is None:
+            if scheduler is None:
+                session = make_session(pool_size, max_retries)
+            else:
+                # the scheduler is the only retry layer, adapter retries
+                # would skip its token buckets
+                session = make_session(pool_size, 0, status_forcelist=())
+        self.session = session
+        self.transport = HTTPTransport(session) if transport is None \
+            else transport
+        self.metrics = metrics
+        self.timeout = timeout
+        self.max_workers = pool_size
+        self.cache = cache
+        self.validators = validators
+        self.flights = SingleFlight() if flights is None else flights
+        self.decoder = pick_decoder() if decoder is None else decoder
+        self.scheduler = scheduler
+        if dispatcher is not None and lane is not None:
+            dispatcher.check_lane(lane)
+        self.dispatcher = dispatcher
+        self.lane = lane
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+        self.transport.close()
+
+    def spawn(self, *symbols):
+        """
+        Return a new IEX for other symbol(s) that shares this instance's
+        session and settings, so both reuse the same connection pool
+        """
+        api = IEX(*symbols, session=self.session, timeout=self.timeout,
+                  pool_size=self.max_workers, cache=self.cache,
+                  validators=self.validators, flights=self.flights,
+                  decoder=self.decoder, scheduler=self.scheduler,
+                  dispatcher=self.dispatcher, lane=self.lane,
+                  transport=self.transport, metrics=self.metrics)
+        api.prefix = self.prefix
+        return api
+
+    def map_concurrent(self, func, items):
+        """
+        Call func on each item using up to max_workers threads
+        Results are returned in the same order as items
+        """
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        workers = min(self.max_workers, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, items))
 
     def invalid_args(self):
         if len(self.symbols.split(",")) > 1:
             raise ValueError("Only single arg input are allowed")
 
-    @staticmethod
-    def get_data(url):
-        """get URL and return data as string"""
-        return requests.get("{}".format(url)).text
+    def request(self, url, headers=None):
+        """
+        GET url and return the response
+        The pooled session keeps the connection alive between calls, so only
+        the first call to a host pays for the TCP and TLS handshake
+        Successful responses are kept in cache if the endpoint has a ttl
+        Raises requests.HTTPError for 4xx/5xx responses, after the
+        scheduler's retries if there is one
+        """
+        def send():
+            return self.transport.get(url, headers=headers,
+                                      timeout=self.timeout)
+
+        def schedule():
+            if self.scheduler is None:
+                return send()
+            return self.scheduler.run(url, send)
+        start = time.perf_counter()
+        if self.dispatcher is None:
+            response = schedule()
+        else:
+            response = self.dispatcher.run(self.lane or lane_for(url),
+                                           schedule)
+        if self.metrics is not None:
+            endpoint = endpoint_of(url)
+            self.metrics.observe("request_seconds", endpoint,
+                                 time.perf_counter() - start)
+            self.metrics.observe("response_bytes", endpoint,
+                                 len(response.content))
+        response.raise_for_status()
+        if self.cache is not None and response.status_code == 200:
+            self.cache.set(url, response.content)
+        return response
+
+    def get_data(self, url):
+        """
+        get URL and return data as string
+        Concurrent calls for the same url share 1 request
+        """
+        if self.metrics is not None:
+            self.metrics.mark(endpoint_of(url))
+        return self.flights.do(("data", url), lambda: self._load_data(url))
+
+    def _load_data(self, url):
+        body = None if self.cache is None else self.cache.get(url)
+        if body is None:
+            body = self.request(url).content
+        return body.decode("utf-8")
+
+    def get_json(self, url):
+        """
+        get URL and return data as python object
+        [+] Concurrent calls for the same url share 1 request and 1 parsed
+            object
+        [+] With validators, a 304 Not Modified answer returns the object
+            parsed from the previous response
+        [+] Returned objects may be shared, copy them before changing them
+        """
+        if self.metrics is not None:
+            self.metrics.mark(endpoint_of(url))
+        return self.flights.do(("json", url), lambda: self._load_json(url))
+
+    def decode(self, url, body):
+        """Parse a JSON response body of url with the decoder"""
+        if self.metrics is None:
+            return self.decoder(body)
+        with self.metrics.timer("decode_seconds", endpoint_of(url)):
+            return self.decoder(body)
+
+    def _load_json(self, url):
+        body = None if self.cache is None else self.cache.get(url)
+        if body is not None:
+            return self.decode(url, body)
+        if self.validators is None:
+            return self.decode(url, self.request(url).content)
+        response = self.request(url, self.validators.headers_for(url))
+        if response.status_code == 304:
+            found, data = self.validators.get(url)
+            if found:
+                return data
+            # validators dropped since the request went out, ask again
+            response = self.request(url)
+        data = self.decode(url, response.content)
+        if response.status_code == 200:
+            self.validators.update(url, response.headers, data)
+        return data
 
     @staticmethod
     def get_symbols(*args):
@@ -51,20 +337,29 @@ class IEX:
         return ",".join([arg.upper() for arg in args])
 
     @staticmethod
-    def view_table(json_data):
+    def view_table(json_data, schema=None):
         """
         Convert json data to table in pandas
+        schema: endpoint name in iex_frames.SCHEMAS, e.g.: "quote"
         Need to call main key with json_data
         e.g.:
             appl = Iex("appl")
         json_data = appl.get_quotes()
         print(appl.view_table(json_data["quote"])
         """
-        return pd.DataFrame(json_normalize(json_data))
+        from iex_frames import build_frame
+        return build_frame(json_data, schema)
 
-    def get_batch(self):
+    def get_batch(self, types=("quote", "news", "chart"), period="1m",
+                  last=5, chunk_size=100):
         """
         GET /stock/market/batch
+        types: endpoints to include, e.g.: ("quote", "stats") or "quote,stats"
+        period: range used by the chart, dividends and splits types
+        last: number of items returned by the news type
+        chunk_size: max symbols per request, IEX allows up to 100
+        [+] Symbols are split into chunks of chunk_size, the chunks are
+            fetched concurrently and merged into 1 dict keyed by symbol
         [+] // .../symbol
             {
             "quote": {...},
@@ -85,10 +380,21 @@ class IEX:
             },
             }
         """
-        batch = f"/stock/market/batch?symbols={self.symbols}" +\
-            "&types=quote,news,chart&range=1m&last=5"
-        url = self.prefix + batch
-        return json.loads(self.get_data(url))
+        if not isinstance(types, str):
+            types = ",".join(types)
+        symbols = self.symbols.split(",")
+        chunks = [",".join(symbols[i:i + chunk_size])
+                  for i in range(0, len(symbols), chunk_size)]
+
+        def fetch(chunk):
+            batch = f"/stock/market/batch?symbols={chunk}" +\
+                f"&types={types}&range={period}&last={last}"
+            return self.get_json(self.prefix + batch)
+
+        merged = {}
+        for result in self.map_concurrent(fetch, chunks):
+            merged.update(result)
+        return merged
 
     def get_single_batch(self):
         """
@@ -117,8 +423,9 @@ class IEX:
         batch = f"/stock/{self.symbols}" +\
             "/batch?types=quote,news,chart&range=1m&last=1"
         url = self.prefix + batch
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("book")
     def get_book(self):
         """
         GET /stock/{symbol}/book
@@ -133,8 +440,9 @@ class IEX:
         self.invalid_args()
         book = f"/stock/{self.symbols}/book"
         url = self.prefix + book
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("chart", batch_args=_range_args)
     def get_charts(self, period=None, parameter=None):
         """
         GET /stock/{symbol}/chart/{range}
@@ -143,7 +451,9 @@ class IEX:
             6m: 6 months, 3m: 3 months, 1m: 1 month(default), 1d: 1 day,
             date: specific date(YYYYMMDD) e.g.: 20180129,
             dynamic: 1 day(return 1d or 1m)
-        # TODO
+        parameter:
+            query string of 1 or more parameters below joined with "&",
+            e.g.: "chartByDay=true", "chartLast=5&chartInterval=2"
         Parameters:
             chartReset: boolean. If true, 1d chart will reset at midnight
                         instead of the default behavior of 9:30am ET.
@@ -157,6 +467,8 @@ class IEX:
                              day close instead of the first value.
             chartLast: number. If passed, chart data will return the last
                        N elements
+            chartByDay: boolean. Used only with a date period, returns
+                        the daily bar of that date instead of minute bars
         [+] // .../1d
             [
                 {
@@ -310,26 +622,19 @@ class IEX:
         """
         self.invalid_args()
         chart = f"/stock/{self.symbols}/chart"
-        period_range = ["5y", "2y", "1y", "ytd",
-                        "6m", "3m", "1m", "1d"]
+        period_range = PERIOD_RANGE
         if period is None:
             url = self.prefix + chart + ""
+        elif period in period_range or period == "dynamic":
+            url = self.prefix + chart + "/" + period
         else:
-            if parameter is None:
-                if period in period_range:
-                    url = self.prefix + chart + "/" + period
-                elif period == "dynamic":
-                    url = self.prefix + chart + "/" + period
-                    range_value = json.loads(self.get_data(url))["range"]
-                    data_value = json.loads(self.get_data(url))["data"]
-                    return (range_value, data_value)
-                else:
-                    url = self.prefix + chart + "/date/" + period
-            else:
-                # TODO implement paramenter feature
-                # url = self.prefix + chart + "/" + period + "/" + parameter
-                pass
-        return json.loads(self.get_data(url))
+            url = self.prefix + chart + "/date/" + period
+        if parameter is not None:
+            url += "?" + parameter
+        if period == "dynamic":
+            dynamic = self.get_json(url)
+            return (dynamic["range"], dynamic["data"])
+        return self.get_json(url)
 
     def get_collections(self):
         """
@@ -337,6 +642,7 @@ class IEX:
         """
         pass
 
+    @multi_symbol("company")
     def get_company(self):
         """
         Returns an array of quote objects for a given collection type.
@@ -365,7 +671,7 @@ class IEX:
         self.invalid_args()
         company = f"/stock/{self.symbols}/company"
         url = self.prefix + company
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
     def get_crypto(self):
         """
@@ -381,8 +687,9 @@ class IEX:
         """
         crypto = "/stock/market/crypto"
         url = self.prefix + crypto
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("delayed-quote")
     def get_delayedQuote(self):
         """
         This returns the 15 minute delayed market quote.
@@ -398,8 +705,9 @@ class IEX:
         self.invalid_args()
         delayedQuote = f"/stock/{self.symbols}/delayed-quote"
         url = self.prefix + delayedQuote
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("dividends", batch_args=_range_args)
     def get_dividends(self, period=None):
         """
         period:
@@ -454,8 +762,9 @@ class IEX:
             url = self.prefix + dividends
         else:
             url = self.prefix + dividends + "/" + period
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("earnings", key="earnings")
     def get_earnings(self):
         """
         Pulls data from the four most recent reported quarters.
@@ -518,7 +827,7 @@ class IEX:
         self.invalid_args()
         earnings = f"/stock/{self.symbols}/earnings"
         url = self.prefix + earnings
-        return json.loads(self.get_data(url))["earnings"]
+        return self.get_json(url)["earnings"]
 
     def get_earningsToday(self):
         """
@@ -577,8 +886,9 @@ class IEX:
         """
         earningsToday = "/stock/market/today-earnings"
         url = self.prefix + earningsToday
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("effective-spread")
     def get_effectiveSpread(self):
         """
         [+] This returns an array of effective spread, eligible volume, and
@@ -625,8 +935,10 @@ class IEX:
         self.invalid_args()
         effectiveSpread = f"/stock/{self.symbols}/effective-spread"
         url = self.prefix + effectiveSpread
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("financials", key="financials",
+                  batch_args=lambda period=None: None if period else {})
     def get_financials(self, period=None):
         """
         period: 'annual', 'quarter'(default)
@@ -667,7 +979,7 @@ class IEX:
             url = self.prefix + financials + "?period=" + period
         else:
             url = self.prefix + financials
-        return json.loads(self.get_data(url))["financials"]
+        return self.get_json(url)["financials"]
 
     def get_upcomingIpos(self):
         """
@@ -749,7 +1061,7 @@ class IEX:
         """
         upcomingIpos = "/stock/market/upcoming-ipos"
         url = self.prefix + upcomingIpos
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
     def get_todayIpos(self):
         """
@@ -762,7 +1074,7 @@ class IEX:
         """
         todayIpos = "/stock/market/today-ipos"
         url = self.prefix + todayIpos
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
     def get_thresholdSecurities(self):
         """
@@ -784,6 +1096,7 @@ class IEX:
         """
         pass
 
+    @multi_symbol("stats")
     def get_stats(self):
         """
         GET /stock/{symbol}/stats
@@ -862,8 +1175,9 @@ class IEX:
         self.invalid_args()
         stats = f"/stock/{self.symbols}/stats"
         url = self.prefix + stats
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("largest-trades")
     def get_largestTrades(self):
         """
         This returns 15 minute delayed, last sale eligible trades.
@@ -890,7 +1204,7 @@ class IEX:
         self.invalid_args()
         largestTrades = f"/stock/{self.symbols}/largest-trades"
         url = self.prefix + largestTrades
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
     def get_topTen(self, parameter):
         """
@@ -948,8 +1262,9 @@ class IEX:
         """
         topTen = "/stock/market/list/"
         url = self.prefix + topTen + parameter
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("logo", key="url")
     def get_logo(self):
         """
         GET /stock/{symbol}/logo
@@ -961,7 +1276,7 @@ class IEX:
         self.invalid_args()
         logo = f"/stock/{self.symbols}/logo"
         url = self.prefix + logo
-        return json.loads(self.get_data(url))["url"]
+        return self.get_json(url)["url"]
 
     def get_batchNews(self, latest=None):
         """
@@ -993,8 +1308,10 @@ class IEX:
             url = self.prefix + batchNews
         else:
             url = self.prefix + batchNews + "/last/" + str(latest)
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("news",
+                  batch_args=lambda latest=None: {"last": latest or 10})
     def get_news(self, latest=None):
         """
         latest = Number between 1 and 50. Default is 10.
@@ -1026,7 +1343,7 @@ class IEX:
             url = self.prefix + news
         else:
             url = self.prefix + news + "/last/" + str(latest)
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
     def get_batchOHLC(self):
         """
@@ -1047,8 +1364,9 @@ class IEX:
         """
         batchOHLC = "/stock/market/ohlc"
         url = self.prefix + batchOHLC
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("ohlc")
     def get_OHLC(self):
         """
         Returns the official open and close for a give symbol.
@@ -1069,8 +1387,9 @@ class IEX:
         self.invalid_args()
         OHLC = f"/stock/{self.symbols}/ohlc"
         url = self.prefix + OHLC
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("peers")
     def get_rivals(self):
         """
         rivals = peers in IEX API
@@ -1089,7 +1408,7 @@ class IEX:
         self.invalid_args()
         rivals = f"/stock/{self.symbols}/peers"
         url = self.prefix + rivals
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
     def get_batchPrevious(self):
         """
@@ -1112,8 +1431,9 @@ class IEX:
         """
         batchPrevious = "/stock/market/previous"
         url = self.prefix + batchPrevious
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("previous")
     def get_previous(self):
         """
         [+] This returns previous day adjusted price data for a single stock,
@@ -1136,8 +1456,9 @@ class IEX:
         self.invalid_args()
         previous = f"/stock/{self.symbols}/previous"
         url = self.prefix + previous
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("price")
     def get_price(self):
         """
         [+] Return the current stock price of a stock as a float number,
@@ -1152,6 +1473,8 @@ class IEX:
         url = self.prefix + price
         return float(self.get_data(url))
 
+    @multi_symbol("quote", batch_args=lambda percentage=False:
+                  None if percentage else {})
     def get_quote(self, percentage=False):
         """
         displayPercent: If set to true, all percentage values will be
@@ -1267,8 +1590,9 @@ class IEX:
             url = self.prefix + quote
         else:
             url = self.prefix + quote + "?displayPercent=true"
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("relevant")
     def get_relevant(self):
         """
         [+] Similar to the peers endpoint, except this will return most active
@@ -1291,7 +1615,7 @@ class IEX:
         self.invalid_args()
         relevant = f"/stock/{self.symbols}/relevant"
         url = self.prefix + relevant
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
     def get_sectorP(self):
         """
@@ -1311,8 +1635,9 @@ class IEX:
         """
         sectorP = "/stock/market/sector-performance"
         url = self.prefix + sectorP
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("splits", batch_args=_range_args)
     def get_splits(self, period=None):
         """
         period:
@@ -1337,8 +1662,9 @@ class IEX:
             url = self.prefix + splits
         else:
             url = self.prefix + splits + "/" + period
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol()
     def get_timeSeries(self):
         """
         An alternate way to access the chart endpoint.
@@ -1362,10 +1688,11 @@ class IEX:
         ]
         """
         self.invalid_args()
-        timeSeries = f"/stock/aapl/time-series"
+        timeSeries = f"/stock/{self.symbols}/time-series"
         url = self.prefix + timeSeries
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
+    @multi_symbol("volume-by-venue")
     def get_volByVenue(self):
         """
         volByVenue = Volume by Venue
@@ -1398,7 +1725,7 @@ class IEX:
         self.invalid_args()
         volByVenue = f"/stock/{self.symbols}/volume-by-venue"
         url = self.prefix + volByVenue
-        return json.loads(self.get_data(url))
+        return self.get_json(url)
 
 
 if __name__ == "__main__":
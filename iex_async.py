@@ -0,0 +1,87 @@
+"""
+Async IEX API data
+__version__ 0.1
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from iex import IEX, make_session
+
+
+class AsyncIEX:
+    """
+    asyncio counterpart of IEX
+    [+] Every get_* method of IEX is available with the same arguments,
+        but returns a coroutine
+    [+] Requests run on a thread pool over 1 pooled session, at most
+        concurrency of them are in flight at any time
+    [+] per_host caps the number of open connections to api.iextrading.com,
+        requests beyond the cap wait for a free connection
+    [+] Use snapshot to fan out several endpoints across a whole universe
+    [+] scheduler: iex_scheduler.Scheduler to rate limit and retry requests,
+        max_retries is then ignored
+    e.g.:
+    >>> async def main():
+    ...     async with AsyncIEX("aapl") as api:
+    ...         quote = await api.get_quote()
+    ...         snap = await api.snapshot(["aapl", "goog"],
+    ...                                   "get_quote", "get_stats")
+    >>> asyncio.run(main())
+    """
+
+    def __init__(self, *symbols, concurrency=50, per_host=10, timeout=10,
+                 max_retries=3, scheduler=None):
+        if scheduler is None:
+            session = make_session(per_host, max_retries)
+        else:
+            # the scheduler is the only retry layer, refer to IEX
+            session = make_session(per_host, 0, status_forcelist=())
+        self.api = IEX(*symbols, session=session, timeout=timeout,
+                       scheduler=scheduler)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop the worker threads and close all pooled connections"""
+        self.executor.shutdown(wait=False)
+        self.api.close()
+
+    def __getattr__(self, name):
+        """Wrap IEX.get_* methods as coroutines"""
+        if not name.startswith("get_") or name == "get_symbols":
+            raise AttributeError(name)
+        method = getattr(IEX, name)
+
+        async def call(*args, **kwargs):
+            return await self.run(self.api, method, *args, **kwargs)
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+    async def run(self, api, method, *args, **kwargs):
+        """Run 1 blocking IEX method on the thread pool"""
+        loop = asyncio.get_running_loop()
+        async with self.semaphore:
+            return await loop.run_in_executor(
+                self.executor, partial(method, api, *args, **kwargs))
+
+    async def snapshot(self, symbols, *methods):
+        """
+        Call each method for each symbol concurrently
+        symbols: list of stock symbols
+        methods: IEX method names, e.g.: "get_quote", "get_stats"
+        Returns {symbol: {method: data}}, raises the first error met
+        """
+        apis = [self.api.spawn(symbol) for symbol in symbols]
+        calls = [self.run(api, getattr(IEX, method))
+                 for api in apis for method in methods]
+        results = iter(await asyncio.gather(*calls))
+        return {api.symbols: {method: next(results) for method in methods}
+                for api in apis}
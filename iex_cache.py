@@ -0,0 +1,299 @@
+"""
+Response cache for iex.py
+__version__ 0.1
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from urllib.parse import parse_qs, urlparse
+
+# seconds to keep a response per endpoint, endpoints not listed are not cached
+DEFAULT_TTLS = {
+    "company": 24 * 3600,
+    "logo": 7 * 24 * 3600,
+    "peers": 24 * 3600,
+    "relevant": 3600,
+    "financials": 24 * 3600,
+    "earnings": 6 * 3600,
+    "dividends": 24 * 3600,
+    "splits": 24 * 3600,
+    "stats": 3600,
+    "effective-spread": 3600,
+}
+
+
+def endpoint_of(url):
+    """
+    Return the endpoint name of an IEX url
+    e.g.:
+        .../stock/aapl/company -> company
+        .../stock/aapl/chart/5y -> chart
+        .../stock/market/batch?... -> batch
+    """
+    parts = urlparse(url).path.strip("/").split("/")
+    if "stock" in parts:
+        parts = parts[parts.index("stock") + 1:]
+        return parts[1] if len(parts) > 1 else parts[0]
+    return parts[-1]
+
+
+class ResponseCache:
+    """
+    Base class of the response caches
+    [+] Keeps raw response bodies (bytes) keyed by url
+    [+] ttls: {endpoint: seconds}, defaults to DEFAULT_TTLS
+        Batch urls use the shortest ttl of their types, and are not cached
+        if any type is missing from ttls
+    [+] max_bytes: least recently used responses are evicted past this size
+    [+] hits and misses count lookups of cacheable urls only
+    [+] Subclasses implement _load, _store, _delete, _evict and clear
+    """
+
+    def __init__(self, ttls=None, max_bytes=64 * 1024 * 1024):
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def ttl_for(self, url):
+        """Seconds to cache url for, 0 means do not cache"""
+        endpoint = endpoint_of(url)
+        if endpoint != "batch":
+            return self.ttls.get(endpoint, 0)
+        types = parse_qs(urlparse(url).query).get("types", [""])[0]
+        return min(self.ttls.get(name, 0) for name in types.split(","))
+
+    def get(self, url):
+        """Return the cached body of url, None if missing or expired"""
+        if not self.ttl_for(url):
+            return None
+        with self.lock:
+            entry = self._load(url)
+            if entry is not None and entry[0] < time.time():
+                self._delete(url)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, url, body):
+        """Cache body of url if its endpoint has a ttl"""
+        ttl = self.ttl_for(url)
+        if not ttl or len(body) > self.max_bytes:
+            return
+        with self.lock:
+            self._store(url, time.time() + ttl, body)
+            self._evict()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self), "bytes": self.size}
+
+
+class MemoryCache(ResponseCache):
+    """
+    In memory LRU cache, lost when the process ends
+    >>> api = IEX("aapl", cache=MemoryCache(max_bytes=16 * 1024 * 1024))
+    """
+
+    def __init__(self, ttls=None, max_bytes=64 * 1024 * 1024):
+        super().__init__(ttls, max_bytes)
+        self.entries = OrderedDict()  # url: (expires, body)
+        self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _load(self, url):
+        entry = self.entries.get(url)
+        if entry is not None:
+            self.entries.move_to_end(url)
+        return entry
+
+    def _store(self, url, expires, body):
+        self._delete(url)
+        self.entries[url] = (expires, body)
+        self.size += len(body)
+
+    def _delete(self, url):
+        entry = self.entries.pop(url, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def _evict(self):
+        while self.size > self.max_bytes:
+            _, (_, body) = self.entries.popitem(last=False)
+            self.size -= len(body)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class SQLiteCache(ResponseCache):
+    """
+    On disk LRU cache in a sqlite file, survives restarts
+    >>> api = IEX("aapl", cache=SQLiteCache("~/.cache/iex.sqlite"))
+    """
+
+    def __init__(self, path, ttls=None, max_bytes=256 * 1024 * 1024):
+        super().__init__(ttls, max_bytes)
+        path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # the lock serialises access, so the connection can cross threads
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                        "url TEXT PRIMARY KEY, expires REAL, used REAL, "
+                        "size INTEGER, body BLOB)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_used "
+                        "ON responses (used)")
+        self.db.commit()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @property
+    def size(self):
+        return self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _load(self, url):
+        entry = self.db.execute("SELECT expires, body FROM responses "
+                                "WHERE url = ?", (url,)).fetchone()
+        if entry is not None:
+            self.db.execute("UPDATE responses SET used = ? WHERE url = ?",
+                            (time.time(), url))
+            self.db.commit()
+        return entry
+
+    def _store(self, url, expires, body):
+        self.db.execute("INSERT OR REPLACE INTO responses "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (url, expires, time.time(), len(body), body))
+        self.db.commit()
+
+    def _delete(self, url):
+        self.db.execute("DELETE FROM responses WHERE url = ?", (url,))
+        self.db.commit()
+
+    def _evict(self):
+        excess = self.size - self.max_bytes
+        if excess <= 0:
+            return
+        freed = 0
+        rows = self.db.execute("SELECT url, size FROM responses "
+                               "ORDER BY used").fetchall()
+        for url, size in rows:
+            if freed >= excess:
+                break
+            self.db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            freed += size
+        self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+class ValidatorStore:
+    """
+    ETag and Last-Modified validators of each url, kept with the parsed data
+    [+] IEX sends them back as If-None-Match / If-Modified-Since, and on a
+        304 Not Modified reuses the parsed data without downloading or
+        parsing the body again
+    [+] max_entries: least recently used urls are dropped past this count
+    [+] not_modified counts the responses answered from the store
+    >>> api = IEX("aapl", validators=ValidatorStore())
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # url: (etag, last_modified, data)
+        self.not_modified = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def headers_for(self, url):
+        """Return the conditional request headers of url, None if unknown"""
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry is None:
+            return None
+        etag, last_modified, _ = entry
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def get(self, url):
+        """Return (True, data) of a not modified url, (False, None) if gone"""
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None:
+                return False, None
+            self.entries.move_to_end(url)
+            self.not_modified += 1
+            return True, entry[2]
+
+    def update(self, url, headers, data):
+        """Keep data of url if the response carries validators"""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        with self.lock:
+            if not etag and not last_modified:
+                self.entries.pop(url, None)
+                return
+            self.entries[url] = (etag, last_modified, data)
+            self.entries.move_to_end(url)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class SingleFlight:
+    """
+    Share 1 call between concurrent callers asking for the same key
+    [+] The first caller runs the call, callers arriving while it is in
+        flight wait for it and get the same result, or the same exception
+    [+] Works across threads. AsyncIEX runs requests on threads, so
+        asyncio tasks are coalesced as well
+    [+] shared counts the calls answered by another caller's flight
+    """
+
+    def __init__(self):
+        self.calls = {}  # key: Future of the call in flight
+        self.shared = 0
+        self.lock = threading.Lock()
+
+    def do(self, key, func):
+        """Return func(), or the result of the same key already in flight"""
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+            else:
+                self.shared += 1
+        if leader:
+            try:
+                future.set_result(func())
+            except BaseException as error:
+                future.set_exception(error)
+            finally:
+                with self.lock:
+                    del self.calls[key]
+        return future.result()
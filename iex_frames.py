@@ -0,0 +1,154 @@
+"""
+Build pandas DataFrames from IEX JSON
+__version__ 0.1
+"""
+import numpy as np
+import pandas as pd
+
+# field types of the flat endpoints, taken from the keys documented in iex.py
+# fields not listed are left for pandas to infer
+# "category" fields are repeated strings, only converted by apply_dtypes
+_CHART_FLOATS = ["open", "high", "low", "close", "average", "notional",
+                 "marketHigh", "marketLow", "marketAverage", "marketNotional",
+                 "marketOpen", "marketClose", "changeOverTime",
+                 "marketChangeOverTime", "unadjustedClose", "change",
+                 "changePercent", "vwap"]
+_CHART_INTS = ["volume", "numberOfTrades", "marketVolume",
+               "marketNumberOfTrades", "unadjustedVolume"]
+_QUOTE_FLOATS = ["open", "close", "high", "low", "latestPrice",
+                 "iexRealtimePrice", "delayedPrice", "extendedPrice",
+                 "extendedChange", "extendedChangePercent", "previousClose",
+                 "change", "changePercent", "iexMarketPercent", "iexBidPrice",
+                 "iexAskPrice", "peRatio", "week52High", "week52Low",
+                 "ytdChange"]
+_QUOTE_INTS = ["openTime", "closeTime", "latestUpdate", "latestVolume",
+               "iexRealtimeSize", "iexLastUpdated", "delayedPriceTime",
+               "extendedPriceTime", "iexVolume", "avgTotalVolume",
+               "iexBidSize", "iexAskSize", "marketCap"]
+
+_QUOTE_CATEGORIES = ["symbol", "companyName", "primaryExchange", "sector",
+                     "calculationPrice", "latestSource", "latestTime"]
+
+SCHEMAS = {
+    "chart": {**dict.fromkeys(_CHART_FLOATS, "float"),
+              **dict.fromkeys(_CHART_INTS, "int"),
+              **dict.fromkeys(["minute", "label"], "category")},
+    "quote": {**dict.fromkeys(_QUOTE_FLOATS, "float"),
+              **dict.fromkeys(_QUOTE_INTS, "int"),
+              **dict.fromkeys(_QUOTE_CATEGORIES, "category")},
+    "previous": {**dict.fromkeys(["open", "high", "low", "close", "change",
+                                  "changePercent", "vwap"], "float"),
+                 **dict.fromkeys(["volume", "unadjustedVolume"], "int"),
+                 "symbol": "category"},
+    "largest-trades": {"price": "float", "size": "int", "time": "int",
+                       "venue": "category", "venueName": "category"},
+    "volume-by-venue": {"volume": "int", "marketPercent": "float",
+                        "avgMarketPercent": "float", "venue": "category",
+                        "venueName": "category"},
+    "company": dict.fromkeys(["exchange", "industry", "issueType", "sector"],
+                             "category"),
+    "dividends": {"amount": "float", "flag": "category", "type": "category",
+                  "qualified": "category", "indicated": "category"},
+}
+
+# fields parsed into the DatetimeIndex of each endpoint by apply_dtypes
+INDEXES = {
+    "chart": ["date", "minute"],
+    "previous": ["date"],
+    "largest-trades": ["time"],
+    "volume-by-venue": ["date"],
+    "dividends": ["exDate"],
+}
+
+
+def _column(values, kind):
+    """Convert 1 column of values to a NumPy array of the schema kind"""
+    if kind == "float":
+        # None becomes NaN
+        return np.array(values, dtype=np.float64)
+    if kind == "int":
+        array = np.array(values)
+        if array.dtype.kind == "i" or not len(values):
+            return array.astype(np.int64, copy=False)
+        # same as pandas, missing or fractional values turn the column
+        # into floats, never truncated
+        return np.array(values, dtype=np.float64)
+    return values
+
+
+def build_frame(data, schema=None):
+    """
+    Convert IEX JSON data to a DataFrame
+    data: a record (dict) or a list of records
+    schema: name of the endpoint in SCHEMAS, e.g.: "chart", "quote"
+    [+] Flat records are built column by column in 1 pass, typed by the
+        schema, which is far cheaper than flattening each record
+    [+] Records with nested objects fall back to json_normalize, which
+        flattens them into "parent.child" columns
+    """
+    records = [data] if isinstance(data, dict) else data
+    if not records:
+        return pd.DataFrame()
+    fields = {}
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, dict):
+                return pd.DataFrame(pd.json_normalize(data))
+            fields[key] = None
+    return build_columns(records, list(fields), schema)
+
+
+def build_columns(records, columns, schema=None):
+    """
+    Build a DataFrame of the given columns from a list of flat records
+    Missing fields become None/NaN, other fields are never read
+    """
+    kinds = SCHEMAS.get(schema, {})
+    return pd.DataFrame({key: _column([record.get(key) for record in records],
+                                      kinds.get(key))
+                         for key in columns}, columns=columns)
+
+
+def _datetime_index(df, fields):
+    """Parse the index fields of df into datetime64 values"""
+    if fields == ["time"]:
+        # epoch milliseconds
+        return pd.to_datetime(df["time"], unit="ms")
+    if fields == ["date", "minute"] and "minute" in df:
+        # 1d charts: date as yyyymmdd, minute as HH:MM
+        stamps = df["date"].astype(str) + df["minute"].astype(str)
+        return pd.to_datetime(stamps, format="%Y%m%d%H:%M")
+    return pd.to_datetime(df[fields[0]])
+
+
+def apply_dtypes(df, schema, downcast=False):
+    """
+    Give a frame built from an endpoint its memory efficient dtypes
+    schema: name of the endpoint in SCHEMAS
+    [+] Repeated strings marked "category" become categoricals
+    [+] The endpoint's date and time fields in INDEXES are parsed into a
+        DatetimeIndex named "date", a 'symbol' outer level is kept. The
+        date field itself becomes datetime64
+    [+] downcast: floats become float32, integers the smallest integer type
+        that holds them
+    """
+    kinds = SCHEMAS.get(schema, {})
+    for column, kind in kinds.items():
+        if column not in df:
+            continue
+        if kind == "category":
+            df[column] = df[column].astype("category")
+        elif downcast and kind in ("float", "int"):
+            df[column] = pd.to_numeric(
+                df[column], downcast="float" if kind == "float" else "integer")
+    fields = INDEXES.get(schema)
+    if fields and fields[0] in df and len(df):
+        stamps = pd.DatetimeIndex(_datetime_index(df, fields), name="date")
+        if fields[0] != "time":
+            df[fields[0]] = pd.to_datetime(df[fields[0]])
+        if isinstance(df.index, pd.MultiIndex):
+            df.index = pd.MultiIndex.from_arrays(
+                [df.index.get_level_values(0), stamps])
+        else:
+            df.index = stamps
+    return df
@@ -0,0 +1,141 @@
+"""
+Latency and payload metrics of iex.py and jsonToPanda.py
+__version__ 0.1
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# upper bounds of the histogram buckets, a last +Inf bucket is implied
+SECONDS_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+BYTES_BUCKETS = [256 * 4 ** i for i in range(10)]  # 256 B to 64 MB
+
+# recorded metrics and their buckets
+METRICS = {
+    "request_seconds": SECONDS_BUCKETS,  # send to response, with retries
+    "response_bytes": BYTES_BUCKETS,  # body size, 0 for a 304
+    "decode_seconds": SECONDS_BUCKETS,  # JSON body to python objects
+    "frame_seconds": SECONDS_BUCKETS,  # python objects to DataFrame
+}
+
+
+class Histogram:
+    """
+    Count of observed values per bucket, with their sum
+    buckets: sorted upper bounds, values above the last go to +Inf
+    """
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Return [(upper bound, values <= bound)], Prometheus style"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + [float("inf")], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Metrics:
+    """
+    Histograms of METRICS per IEX endpoint, e.g.: quote, chart, batch
+    [+] Pass 1 instance to IEX or DataReader, spawned clients share it
+    [+] observe costs a bisect and a lock, cheap enough to leave on
+    [+] callbacks: functions called as callback(metric, endpoint, value)
+        on every observation, e.g.: to feed another metrics library
+    [+] Export with as_dict() or prometheus() (text exposition format)
+    e.g.:
+    >>> metrics = Metrics()
+    >>> DataReader("aapl", metrics=metrics).quote()
+    >>> metrics.as_dict()["frame_seconds"]["quote"]["sum"]
+    >>> print(metrics.prometheus())
+    """
+
+    def __init__(self, callbacks=None):
+        self.histograms = {}  # (metric, endpoint): Histogram
+        self.callbacks = list(callbacks or [])
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def subscribe(self, callback):
+        """Call callback(metric, endpoint, value) on every observation"""
+        self.callbacks.append(callback)
+
+    def observe(self, metric, endpoint, value):
+        with self.lock:
+            histogram = self.histograms.get((metric, endpoint))
+            if histogram is None:
+                histogram = self.histograms[metric, endpoint] = \
+                    Histogram(METRICS[metric])
+            histogram.observe(value)
+        for callback in self.callbacks:
+            callback(metric, endpoint, value)
+
+    @contextmanager
+    def timer(self, metric, endpoint):
+        """Observe the seconds spent in the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(metric, endpoint, time.perf_counter() - start)
+
+    def mark(self, endpoint):
+        """Remember the endpoint this thread fetched last"""
+        self.local.endpoint = endpoint
+
+    def last_endpoint(self):
+        """Endpoint this thread fetched last, default label of frame metrics"""
+        return getattr(self.local, "endpoint", "unknown")
+
+    def as_dict(self):
+        """
+        Return {metric: {endpoint: {"count", "sum", "buckets"}}}
+        buckets: {upper bound: count in that bucket}, not cumulative
+        """
+        with self.lock:
+            result = {}
+            for (metric, endpoint), histogram in self.histograms.items():
+                bounds = histogram.buckets + [float("inf")]
+                result.setdefault(metric, {})[endpoint] = {
+                    "count": histogram.count, "sum": histogram.sum,
+                    "buckets": dict(zip(bounds, histogram.counts))}
+            return result
+
+    def prometheus(self, prefix="iex_"):
+        """Return the histograms in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for metric in METRICS:
+                series = {endpoint: histogram for (name, endpoint), histogram
+                          in self.histograms.items() if name == metric}
+                if not series:
+                    continue
+                name = prefix + metric
+                lines.append(f"# TYPE {name} histogram")
+                for endpoint in sorted(series):
+                    histogram = series[endpoint]
+                    label = f'endpoint="{endpoint}"'
+                    for bound, total in histogram.cumulative():
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(
+                            f'{name}_bucket{{{label},le="{le}"}} {total}')
+                    lines.append(f"{name}_sum{{{label}}} {histogram.sum:g}")
+                    lines.append(f"{name}_count{{{label}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
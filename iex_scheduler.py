@@ -0,0 +1,249 @@
+"""
+Rate limiting and retries for iex.py
+__version__ 0.1
+"""
+import email.utils
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from queue import Full
+from urllib.parse import urlparse
+
+from iex_cache import endpoint_of
+
+# (requests per second, burst) per endpoint class
+DEFAULT_LIMITS = {
+    "stock": (100, 100),
+    "market": (20, 20),
+    "batch": (20, 20),
+}
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# dispatcher lane weights, and the endpoints sent in the interactive lane
+DEFAULT_WEIGHTS = {"interactive": 8, "bulk": 1}
+INTERACTIVE_ENDPOINTS = {"price", "quote", "delayed-quote", "book", "ohlc",
+                         "previous", "list"}
+
+
+def lane_for(url):
+    """Default dispatcher lane of an IEX url"""
+    if endpoint_of(url) in INTERACTIVE_ENDPOINTS:
+        return "interactive"
+    return "bulk"
+
+
+def endpoint_class(url):
+    """
+    Return the rate limit class of an IEX url
+    batch: /stock/market/batch, market: other /stock/market/ urls,
+    stock: everything else, e.g.: /stock/aapl/quote
+    """
+    path = urlparse(url).path
+    if "/stock/market/batch" in path:
+        return "batch"
+    if "/stock/market/" in path:
+        return "market"
+    return "stock"
+
+
+class TokenBucket:
+    """
+    Allow rate calls per second on average, and up to burst at once
+    acquire blocks until a token is free
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens +
+                                  (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.resume_at and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.resume_at - now,
+                           (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hand out no tokens for seconds, e.g.: after a 429 Retry-After"""
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+
+class Scheduler:
+    """
+    Client side scheduler of IEX requests
+    [+] limits: {endpoint class: (requests per second, burst)}, 1 token
+        bucket per class, refer to endpoint_class
+    [+] Responses with a status in RETRY_STATUS and connection errors are
+        retried up to max_retries times, sleeping a random time between 0
+        and base * 2 ** attempt seconds (capped at max_backoff)
+    [+] A Retry-After header replaces the backoff, a 429 also pauses the
+        bucket of its class so other callers back off as well
+    [+] max_pending bounds the requests waiting or in flight, callers
+        beyond it wait up to queue_timeout seconds, then raise queue.Full
+    e.g.:
+    >>> api = IEX("aapl", scheduler=Scheduler())
+    """
+
+    def __init__(self, limits=None, max_retries=5, base=0.1,
+                 max_backoff=30.0, max_pending=256, queue_timeout=None):
+        limits = DEFAULT_LIMITS if limits is None else limits
+        self.buckets = {name: TokenBucket(rate, burst)
+                        for name, (rate, burst) in limits.items()}
+        self.max_retries = max_retries
+        self.base = base
+        self.max_backoff = max_backoff
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.queue_timeout = queue_timeout
+        self.retries = 0
+        # requests is imported here, not at module load, refer to iex.py
+        import requests
+        self.transient = (requests.ConnectionError, requests.Timeout)
+
+    def backoff(self, attempt):
+        """Full jitter exponential backoff"""
+        return random.uniform(0, min(self.max_backoff,
+                                     self.base * 2 ** attempt))
+
+    @staticmethod
+    def retry_after(response):
+        """Seconds asked by a Retry-After header, None if absent"""
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, when.timestamp() - time.time())
+
+    def run(self, url, send):
+        """
+        Call send() for url within the rate limit of its class and return
+        the response, retrying as described in the class doc
+        The last response is returned even if it is still an error
+        """
+        if not self.pending.acquire(timeout=self.queue_timeout):
+            raise Full("too many IEX requests pending")
+        try:
+            bucket = self.buckets[endpoint_class(url)]
+            for attempt in range(self.max_retries + 1):
+                bucket.acquire()
+                last = attempt == self.max_retries
+                try:
+                    response = send()
+                except self.transient:
+                    if last:
+                        raise
+                    delay = self.backoff(attempt)
+                else:
+                    if response.status_code not in RETRY_STATUS or last:
+                        return response
+                    delay = self.retry_after(response)
+                    if delay is None:
+                        delay = self.backoff(attempt)
+                    elif response.status_code == 429:
+                        bucket.pause(delay)
+                self.retries += 1
+                time.sleep(min(delay, self.max_backoff))
+        finally:
+            self.pending.release()
+
+
+class PriorityDispatcher:
+    """
+    Run IEX requests on a fixed number of workers, taken from weighted lanes
+    [+] weights: {lane: weight}, while several lanes have requests waiting,
+        each lane gets a share of the workers proportional to its weight
+    [+] A lane that was idle starts level with the busiest lane, so a
+        request arriving in the interactive lane is served before the
+        backlog of a bulk lane, and bulk requests use whatever is left
+    [+] workers should match the connection pool size of the IEX session
+    e.g.:
+    >>> dispatcher = PriorityDispatcher()
+    >>> api = IEX("aapl", dispatcher=dispatcher)  # lane from lane_for
+    >>> backfill = IEX("aapl", dispatcher=dispatcher, lane="bulk")
+    """
+
+    def __init__(self, weights=None, workers=10):
+        self.weights = DEFAULT_WEIGHTS if weights is None else weights
+        self.lanes = {lane: deque() for lane in self.weights}
+        # stride scheduling, the lane with the lowest pass runs next
+        self.passes = dict.fromkeys(self.weights, 0.0)
+        self.ready = threading.Condition()
+        self.closed = False
+        self.threads = [threading.Thread(target=self._work, daemon=True)
+                        for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def check_lane(self, lane):
+        """Raise ValueError if lane is not one of the weighted lanes"""
+        if lane not in self.lanes:
+            raise ValueError(f"unknown dispatcher lane {lane!r}, "
+                             f"lanes: {sorted(self.lanes)}")
+
+    def submit(self, lane, func):
+        """Queue func in lane and return a Future of its result"""
+        self.check_lane(lane)
+        future = Future()
+        with self.ready:
+            if self.closed:
+                raise RuntimeError("dispatcher is closed")
+            busy = [self.passes[name] for name, jobs in self.lanes.items()
+                    if jobs]
+            if busy and not self.lanes[lane]:
+                # no credit saved up while idle
+                self.passes[lane] = max(self.passes[lane], min(busy))
+            self.lanes[lane].append((future, func))
+            self.ready.notify()
+        return future
+
+    def run(self, lane, func):
+        """Run func in lane and return its result once a worker is done"""
+        return self.submit(lane, func).result()
+
+    def _next(self):
+        lane = min((name for name, jobs in self.lanes.items() if jobs),
+                   key=self.passes.__getitem__)
+        self.passes[lane] += 1 / self.weights[lane]
+        return self.lanes[lane].popleft()
+
+    def _work(self):
+        while True:
+            with self.ready:
+                while not self.closed and not any(self.lanes.values()):
+                    self.ready.wait()
+                if not any(self.lanes.values()):
+                    return
+                future, func = self._next()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func())
+            except BaseException as error:
+                future.set_exception(error)
+
+    def close(self):
+        """Finish the queued requests, then stop the workers"""
+        with self.ready:
+            self.closed = True
+            self.ready.notify_all()
+        for thread in self.threads:
+            thread.join()
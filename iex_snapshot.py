@@ -0,0 +1,130 @@
+"""
+Market wide snapshot of IEX data in a preallocated NumPy table
+__version__ 0.1
+"""
+import numpy as np
+import pandas as pd
+
+# 1 row per symbol, names follow the IEX keys
+SNAPSHOT_DTYPE = np.dtype([
+    ("open", "f8"), ("openTime", "i8"),
+    ("close", "f8"), ("closeTime", "i8"),
+    ("high", "f8"), ("low", "f8"),
+    ("previousClose", "f8"), ("previousVolume", "i8"), ("vwap", "f8"),
+    ("latestPrice", "f8"), ("latestVolume", "i8"), ("latestUpdate", "i8"),
+    ("change", "f8"), ("changePercent", "f8"),
+])
+
+
+class MarketSnapshot:
+    """
+    Whole market snapshot, updated in place tick after tick
+    [+] table is a structured NumPy array with 1 row per symbol, the row of
+        a symbol never changes once assigned (index maps symbol to row)
+    [+] Rows are preallocated for capacity symbols, the table doubles in
+        size if more symbols show up
+    [+] Missing floats are NaN, missing integers 0
+    [+] No DataFrame is built per tick, use frame() when a table is needed
+    e.g.:
+    >>> snapshot = MarketSnapshot()
+    >>> snapshot.refresh(IEX())  # get_batchOHLC + get_batchPrevious
+    >>> snapshot["AAPL"]["close"]
+    >>> snapshot.view()["close"]  # column of every symbol, no copy
+    """
+
+    def __init__(self, symbols=(), capacity=10000):
+        self.table = self._empty(capacity)
+        self.index = {}  # symbol: row
+        self.symbols = []
+        for symbol in symbols:
+            self.row(symbol.upper())
+
+    @staticmethod
+    def _empty(capacity):
+        table = np.zeros(capacity, dtype=SNAPSHOT_DTYPE)
+        for name in SNAPSHOT_DTYPE.names:
+            if SNAPSHOT_DTYPE[name].kind == "f":
+                table[name] = np.nan
+        return table
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __getitem__(self, symbol):
+        return self.table[self.index[symbol.upper()]]
+
+    def row(self, symbol):
+        """Return the row of symbol, assigning the next free one if new"""
+        row = self.index.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            if row == len(self.table):
+                grown = self._empty(2 * len(self.table))
+                grown[:row] = self.table
+                self.table = grown
+            self.index[symbol] = row
+            self.symbols.append(symbol)
+        return row
+
+    def view(self):
+        """Return the used rows of table, a view, not a copy"""
+        return self.table[:len(self.symbols)]
+
+    def _update(self, records, fields):
+        """
+        Write records {symbol: {key: value}} into fields {column: getter}
+        Values are gathered per column, then written with 1 NumPy
+        assignment per column
+        """
+        rows = np.fromiter((self.row(symbol) for symbol in records),
+                           dtype=np.intp, count=len(records))
+        for column, getter in fields.items():
+            values = [getter(record) for record in records.values()]
+            if SNAPSHOT_DTYPE[column].kind == "i":
+                values = [value or 0 for value in values]
+            else:
+                values = [np.nan if value is None else value
+                          for value in values]
+            self.table[column][rows] = values
+
+    def update_ohlc(self, payload):
+        """Write get_batchOHLC data, {symbol: {open, close, high, low}}"""
+        self._update(payload, {
+            "open": lambda r: (r.get("open") or {}).get("price"),
+            "openTime": lambda r: (r.get("open") or {}).get("time"),
+            "close": lambda r: (r.get("close") or {}).get("price"),
+            "closeTime": lambda r: (r.get("close") or {}).get("time"),
+            "high": lambda r: r.get("high"),
+            "low": lambda r: r.get("low"),
+        })
+
+    def update_previous(self, payload):
+        """Write get_batchPrevious data, {symbol: previous day bar}"""
+        self._update(payload, {
+            "previousClose": lambda r: r.get("close"),
+            "previousVolume": lambda r: r.get("volume"),
+            "vwap": lambda r: r.get("vwap"),
+        })
+
+    def update_quotes(self, quotes):
+        """Write a list of quotes, e.g.: get_topTen data"""
+        self._update({quote["symbol"]: quote for quote in quotes}, {
+            name: lambda r, key=name: r.get(key)
+            for name in ["open", "openTime", "close", "closeTime", "high",
+                         "low", "previousClose", "latestPrice",
+                         "latestVolume", "latestUpdate", "change",
+                         "changePercent"]
+        })
+
+    def refresh(self, api):
+        """Fetch and write market wide OHLC and previous day data"""
+        ohlc, previous = api.map_concurrent(
+            lambda method: method(), [api.get_batchOHLC,
+                                      api.get_batchPrevious])
+        self.update_ohlc(ohlc)
+        self.update_previous(previous)
+
+    def frame(self):
+        """Return a DataFrame copy of the snapshot, indexed by symbol"""
+        return pd.DataFrame(self.view(), index=pd.Index(self.symbols,
+                                                        name="symbol"))
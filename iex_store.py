@@ -0,0 +1,204 @@
+"""
+Local columnar store of IEX daily chart history
+__version__ 0.1
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# stored chart fields and their dtypes, changeOverTime and label are left out
+# because they depend on the range the bars were fetched with
+FIELDS = {
+    "date": "datetime64[D]",
+    "open": "float64",
+    "high": "float64",
+    "low": "float64",
+    "close": "float64",
+    "volume": "int64",
+    "unadjustedVolume": "int64",
+    "change": "float64",
+    "changePercent": "float64",
+    "vwap": "float64",
+}
+
+# chart ranges and the calendar days they are sure to cover, smallest first
+RANGE_DAYS = [("1m", 28), ("3m", 88), ("6m", 180), ("1y", 360),
+              ("2y", 725), ("5y", 1820)]
+
+
+def plan_refresh(last, today, max_date_calls=5):
+    """
+    Return the get_charts periods that cover the bars from last up to today
+    [+] last itself is fetched again, a bar stored during the trading
+        session is only partial and gets replaced
+    [+] Nothing stored (last is None): ["5y"]
+    [+] Up to max_date_calls weekdays: 1 call per date, e.g.:
+        ["20181101", "20181102"], each asking for the daily bar only
+    [+] Otherwise the smallest range that reaches back to last
+    """
+    if last is None:
+        return ["5y"]
+    if last > today:
+        return []
+    days = np.arange(last, today + np.timedelta64(1, "D"))
+    weekdays = days[np.is_busday(days)]
+    if len(weekdays) <= max_date_calls:
+        return [str(day).replace("-", "") for day in weekdays]
+    gap = int((today - last) / np.timedelta64(1, "D"))
+    for period, covered in RANGE_DAYS:
+        if gap < covered:
+            return [period]
+    return ["5y"]
+
+
+class ChartStore:
+    """
+    Daily chart bars on disk, 1 NumPy file per column
+    [+] Layout: root/SYMBOL/YEAR/column.npy, partitioned by symbol and year
+        so an append only rewrites the partitions of the new bars, and a
+        range query only opens the years it covers
+    [+] Files are opened memory mapped, reads do not touch the network
+    [+] Missing integers are stored as 0, missing floats as NaN
+    e.g.:
+    >>> store = ChartStore("~/iex_charts")
+    >>> store.refresh(IEX("aapl", "goog"))
+    >>> store.read("AAPL", start="2018-01-01", columns=["close"])
+    """
+
+    def __init__(self, root):
+        self.root = os.path.expanduser(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def symbols(self):
+        """Return the stored symbols"""
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def _years(self, symbol):
+        path = os.path.join(self.root, symbol.upper())
+        if not os.path.isdir(path):
+            return []
+        return sorted(int(year) for year in os.listdir(path) if year.isdigit())
+
+    def _partition(self, symbol, year):
+        return os.path.join(self.root, symbol.upper(), str(year))
+
+    def _load(self, symbol, year, columns):
+        path = self._partition(symbol, year)
+        return {column: np.load(os.path.join(path, column + ".npy"),
+                                mmap_mode="r")
+                for column in columns}
+
+    def last_date(self, symbol):
+        """Return the date of the last stored bar, None if nothing stored"""
+        years = self._years(symbol)
+        if not years:
+            return None
+        return self._load(symbol, years[-1], ["date"])["date"][-1]
+
+    def write(self, symbol, bars):
+        """
+        Merge chart bars (JSON from get_charts) into the store
+        Bars of a date already stored replace the stored ones
+        Returns the number of bars written
+        """
+        bars = [bar for bar in bars if bar.get("date")]
+        if not bars:
+            return 0
+        new = {}
+        for field, dtype in FIELDS.items():
+            values = [bar.get(field) for bar in bars]
+            if dtype == "int64":
+                values = [value or 0 for value in values]
+            elif field == "date":
+                # dated charts use yyyymmdd, ranges yyyy-mm-dd
+                values = [value if "-" in value else
+                          f"{value[:4]}-{value[4:6]}-{value[6:]}"
+                          for value in values]
+            new[field] = np.array(values, dtype=dtype)
+        years = new["date"].astype("datetime64[Y]").astype(int) + 1970
+        for year in np.unique(years):
+            part = {field: values[years == year]
+                    for field, values in new.items()}
+            if year in self._years(symbol):
+                old = self._load(symbol, year, FIELDS)
+                part = {field: np.concatenate([old[field], part[field]])
+                        for field in FIELDS}
+            # keep the last bar of each date, in date order
+            dates = part["date"][::-1]
+            _, first = np.unique(dates, return_index=True)
+            keep = len(dates) - 1 - first
+            self._save(symbol, year,
+                       {field: values[keep] for field, values in part.items()})
+        return len(bars)
+
+    def _save(self, symbol, year, columns):
+        path = self._partition(symbol, year)
+        os.makedirs(path, exist_ok=True)
+        for column, values in columns.items():
+            # write aside then rename, readers never see a partial file
+            temp = os.path.join(path, column + ".tmp.npy")
+            np.save(temp, np.ascontiguousarray(values))
+            os.replace(temp, os.path.join(path, column + ".npy"))
+
+    def read(self, symbol, start=None, end=None, columns=None):
+        """
+        Return stored bars of symbol as a DataFrame indexed by date
+        start, end: first and last date to include, e.g.: "2018-01-31"
+        columns: fields to read, defaults to all of FIELDS
+        """
+        columns = [c for c in (columns or FIELDS) if c != "date"]
+        start = None if start is None else np.datetime64(start, "D")
+        end = None if end is None else np.datetime64(end, "D")
+        parts = []
+        for year in self._years(symbol):
+            if start is not None and year < start.astype(object).year:
+                continue
+            if end is not None and year > end.astype(object).year:
+                continue
+            part = self._load(symbol, year, ["date"] + columns)
+            mask = np.ones(len(part["date"]), dtype=bool)
+            if start is not None:
+                mask &= part["date"] >= start
+            if end is not None:
+                mask &= part["date"] <= end
+            parts.append({column: values[mask]
+                          for column, values in part.items()})
+        if not parts:
+            return pd.DataFrame(columns=columns,
+                                index=pd.DatetimeIndex([], name="date"))
+        data = {column: np.concatenate([part[column] for part in parts])
+                for column in ["date"] + columns}
+        index = pd.DatetimeIndex(data.pop("date"), name="date")
+        return pd.DataFrame(data, index=index, columns=columns)
+
+    def refresh(self, api, today=None, max_date_calls=5):
+        """
+        Fetch the bars from the last stored bar of each symbol of api (an
+        IEX client) on, and merge them in
+        [+] The periods fetched per symbol come from plan_refresh, so a store
+            refreshed daily only asks for the daily bars of the last stored
+            date and today per symbol
+        [+] All requests of all symbols run concurrently on api's pool
+        [+] Bars already stored are replaced, never duplicated
+        today: last date to cover, defaults to today
+        Returns {symbol: number of bars written}
+        """
+        today = np.datetime64(today or "today", "D")
+        tasks = []
+        for symbol in api.symbols.split(","):
+            plan = plan_refresh(self.last_date(symbol), today, max_date_calls)
+            tasks += [(symbol, period) for period in plan]
+
+        def fetch(task):
+            symbol, period = task
+            parameter = None if period in dict(RANGE_DAYS) else \
+                "chartByDay=true"
+            return api.spawn(symbol).get_charts(period, parameter)
+
+        fetched = {symbol: [] for symbol in api.symbols.split(",")}
+        for (symbol, _), bars in zip(tasks, api.map_concurrent(fetch, tasks)):
+            fetched[symbol] += bars
+        return {symbol: self.write(symbol, bars)
+                for symbol, bars in fetched.items()}
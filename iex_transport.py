@@ -0,0 +1,144 @@
+"""
+Pluggable transports for iex.py, live HTTP, recording and replay
+__version__ 0.1
+"""
+import hashlib
+import json
+import os
+import random
+import time
+from urllib.parse import urlparse
+
+# response headers kept in fixtures, the ones iex.py reads
+RECORDED_HEADERS = ["Content-Type", "ETag", "Last-Modified", "Retry-After"]
+
+
+def fixture_key(url):
+    """
+    Return the fixture name of url
+    Only the path and query are hashed, so fixtures recorded against one
+    host replay against any other, e.g.: a local stub server
+    """
+    parts = urlparse(url)
+    target = parts.path + ("?" + parts.query if parts.query else "")
+    return hashlib.sha1(target.encode()).hexdigest()
+
+
+class HTTPTransport:
+    """
+    Send requests with a requests.Session, the default transport of IEX
+    """
+
+    def __init__(self, session=None):
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.session = session
+
+    def get(self, url, headers=None, timeout=None):
+        return self.session.get(url, headers=headers, timeout=timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class RecordingTransport:
+    """
+    Send requests through transport and save every response under root
+    [+] 1 fixture per url: root/KEY.json (url, status, headers) and
+        root/KEY.body (raw body), KEY from fixture_key
+    [+] A url fetched again overwrites its fixture, except with a 304 Not
+        Modified (conditional requests, refer to ValidatorStore): only
+        2xx, 4xx and 5xx responses are recorded, a 304 has no body to replay
+    e.g.:
+    >>> recorder = RecordingTransport("fixtures")
+    >>> IEX("aapl", transport=recorder).get_quote()
+    >>> IEX("aapl", transport=ReplayTransport("fixtures")).get_quote()
+    """
+
+    def __init__(self, root, transport=None):
+        self.root = os.path.expanduser(root)
+        os.makedirs(self.root, exist_ok=True)
+        self.transport = HTTPTransport() if transport is None else transport
+
+    def get(self, url, headers=None, timeout=None):
+        response = self.transport.get(url, headers=headers, timeout=timeout)
+        if response.status_code // 100 not in (2, 4, 5):
+            return response
+        meta = {"url": url, "status": response.status_code,
+                "headers": {name: response.headers[name]
+                            for name in RECORDED_HEADERS
+                            if name in response.headers}}
+        path = os.path.join(self.root, fixture_key(url))
+        # write aside then rename, a replay never sees a partial fixture
+        with open(path + ".tmp", "wb") as f:
+            f.write(response.content)
+        os.replace(path + ".tmp", path + ".body")
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f, indent=1)
+        os.replace(path + ".tmp", path + ".json")
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class ReplayTransport:
+    """
+    Answer requests from fixtures saved by RecordingTransport, no network
+    [+] latency: seconds slept per request, plus a random 0 to jitter
+        seconds, to simulate the round trip to the API
+    [+] A request whose If-None-Match matches the recorded ETag gets a 304
+    [+] Fixtures are read from disk once, then kept in memory
+    [+] Raises LookupError for a url that was never recorded
+    e.g.:
+    >>> api = IEX("aapl", transport=ReplayTransport("fixtures", latency=0.02))
+    """
+
+    def __init__(self, root, latency=0.0, jitter=0.0):
+        self.root = os.path.expanduser(root)
+        self.latency = latency
+        self.jitter = jitter
+        self.fixtures = {}
+        self.calls = 0
+        # requests is imported here, not at module load, refer to iex.py
+        from requests import Response
+        from requests.structures import CaseInsensitiveDict
+        self.Response = Response
+        self.Headers = CaseInsensitiveDict
+
+    def _load(self, url):
+        key = fixture_key(url)
+        fixture = self.fixtures.get(key)
+        if fixture is None:
+            path = os.path.join(self.root, key)
+            try:
+                with open(path + ".json") as f:
+                    meta = json.load(f)
+                with open(path + ".body", "rb") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                raise LookupError(f"no fixture for {url} in {self.root}")
+            fixture = self.fixtures[key] = (meta, body)
+        return fixture
+
+    def get(self, url, headers=None, timeout=None):
+        meta, body = self._load(url)
+        self.calls += 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        response = self.Response()
+        response.url = url
+        response.status_code = meta["status"]
+        response.headers = self.Headers(meta["headers"])
+        response.encoding = "utf-8"
+        etag = response.headers.get("ETag")
+        if etag and (headers or {}).get("If-None-Match") == etag:
+            response.status_code = 304
+            body = b""
+        response._content = body
+        return response
+
+    def close(self):
+        pass
@@ -2,9 +2,10 @@
 Converts JSON to table for readability with pandas api
 __version__ = 0.4
 """
+import time
+
 from iex import IEX
-import pandas as pd
-from pandas.io.json import json_normalize
+# pandas and iex_frames are imported on first use, refer to iex.py
 
 
 class DataReader:
@@ -16,17 +17,87 @@ class DataReader:
     [+] Methods like get_price() and get_rivals() are not implemented here
         because output is either an integer or a list, which is not a JSON
         object
-    [+] NOT all methods support multiple arguments, refer to iex.py to find out
-        which methods are supported
+    [+] Methods that support multiple symbols stack each symbol's table
+        with the symbol as the outer index level
+        >>> a = DataReader("aapl", "goog")
+        >>> a.stats().loc["GOOG"]
+    [+] typed=True gives frames memory efficient dtypes, refer to
+        iex_frames.apply_dtypes: categoricals for repeated strings and a
+        DatetimeIndex for endpoints with dates, e.g.: chart, previous
+        downcast=True also shrinks floats to float32 and integers to the
+        smallest integer type
+        >>> a = DataReader("aapl", "goog", typed=True, downcast=True)
+        >>> a.chart(columns=["date", "close"], period="5y")
+    [+] store keeps daily chart history on disk, refer to history
+    [+] metrics: iex_metrics.Metrics, times the request, the JSON decode and
+        the DataFrame build of each call per endpoint
+        >>> metrics = Metrics()
+        >>> DataReader("aapl", metrics=metrics).quote()
+        >>> print(metrics.prometheus())
     """
 
-    def __init__(self, *symbols):
-        self.stock_api = IEX(*symbols)
+    # chart responses, refer to the chart method
+    CHART_ALL = ["date", "label", "high", "low", "volume", "open", "close",
+                 "changeOverTime"]
+    CHART_ONE_DAY = ["minute", "average", "notional", "numberOfTrades",
+                     "marketHigh", "marketLow", "marketAverage",
+                     "marketVolume", "marketNotional", "marketNumberOfTrades",
+                     "marketOpen", "marketClose", "marketChangeOverTime"]
+    CHART_NOT_ONE_DAY = ["unadjustedVolume", "change", "changePercent",
+                         "vwap"]
+
+    def __init__(self, *symbols, typed=False, downcast=False, store=None,
+                 metrics=None):
+        self.stock_api = IEX(*symbols, metrics=metrics)
+        self.typed = typed
+        self.downcast = downcast
+        self.store = store
 
     @staticmethod
-    def table(data):
-        """Convert JSON data to table format as DataFrame"""
-        return pd.DataFrame(json_normalize(data))
+    def table(data, schema=None):
+        """
+        Convert JSON data to table format as DataFrame
+        schema: endpoint name in iex_frames.SCHEMAS, types the columns
+        """
+        from iex_frames import build_frame
+        return build_frame(data, schema)
+
+    def frame(self, data, schema=None, keyed=True, endpoint=None):
+        """
+        Convert IEX data to table format as DataFrame
+        Multi symbol data, which IEX returns keyed by symbol, is converted
+        per symbol and stacked with a 'symbol' outer index level
+        keyed: False for market wide data, which is never keyed by symbol
+        endpoint: label of the frame_seconds metric, defaults to schema,
+                  then to the endpoint this thread fetched last. Multi
+                  symbol data may have been fetched on other threads
+        """
+        metrics = self.stock_api.metrics
+        if metrics is None:
+            return self._frame(data, schema, keyed)
+        endpoint = endpoint or schema or metrics.last_endpoint()
+        with metrics.timer("frame_seconds", endpoint):
+            return self._frame(data, schema, keyed)
+
+    def _frame(self, data, schema, keyed):
+        import pandas as pd
+        if not keyed or len(self.stock_api.symbols.split(",")) == 1:
+            df = self.table(data, schema)
+        else:
+            frames = {symbol: self.table(value, schema)
+                      for symbol, value in data.items() if value}
+            if not frames:
+                # every symbol came back empty, same as a single symbol
+                return self._typed(pd.DataFrame(), schema)
+            df = pd.concat(frames, names=["symbol"])
+        return self._typed(df, schema)
+
+    def _typed(self, df, schema):
+        """Apply the typed dtypes of schema if the reader is typed"""
+        if self.typed:
+            from iex_frames import apply_dtypes
+            return apply_dtypes(df, schema, self.downcast)
+        return df
 
     # pandas join method does not work with staticmethod as decorator
     # TODO find out why self is not required and why regular method works
@@ -81,22 +152,37 @@ class DataReader:
         """
         responses = ["quote", "bids", "asks", "systemEvent"]
         if response in responses:
-            return self.table(self.stock_api.get_book()[response])
+            data = self.stock_api.get_book()
+            schema = "quote" if response == "quote" else None
+            if len(self.stock_api.symbols.split(",")) > 1:
+                return self.frame({symbol: book[response]
+                                   for symbol, book in data.items() if book},
+                                  schema, endpoint="book")
+            return self.frame(data[response], schema, endpoint="book")
 
     def _chart_chk_dynamic(self, period, parameter):
         """
         chart_chk_dynamic = check for 'dynamic' in charts
         [+] Check if period input is 'dynamic'
-        [+] If True, print the dynamic range, which is either 1d or 1m
-            and then return the data
+        [+] If True, fetch the chart once and return the data, the dynamic
+            range, which is either 1d or 1m, is kept in df.attrs["range"]
+            ({symbol: range} for multiple symbols)
         """
         if period == "dynamic":
-            # TODO display current period range in dashboard
-            period_range = self.stock_api.get_charts(period, parameter)[0]
-            print(f"Period is {period_range}")
-            return self.table(self.stock_api.get_charts(period, parameter)[1])
+            dynamic = self.stock_api.get_charts(period, parameter)
+            if len(self.stock_api.symbols.split(",")) > 1:
+                df = self.frame({symbol: data
+                                 for symbol, (_, data) in dynamic.items()},
+                                "chart")
+                df.attrs["range"] = {symbol: period_range for symbol,
+                                     (period_range, _) in dynamic.items()}
+            else:
+                df = self.frame(dynamic[1], "chart")
+                df.attrs["range"] = dynamic[0]
+            return df
         else:
-            return self.table(self.stock_api.get_charts(period, parameter))
+            return self.frame(self.stock_api.get_charts(period, parameter),
+                              "chart")
 
     def _chart_chk_1d(self, period, parameter):
         """
@@ -106,7 +192,8 @@ class DataReader:
         None value will be given is condition are not met
         """
         if period == "1d" or len(period) == 8 and period.isdigit() is True:
-            return self.table(self.stock_api.get_charts(period, parameter))
+            return self.frame(self.stock_api.get_charts(period, parameter),
+                              "chart")
 
     def _chart_chk_not1d(self, period, parameter):
         """
@@ -120,8 +207,8 @@ class DataReader:
         if period in period_range:
             return self._chart_chk_dynamic(period, parameter)
 
-    # TODO yet to implement parameter feature
-    def chart(self, response, period=None, parameter=None):
+    def chart(self, response=None, period=None, parameter=None,
+              columns=None):
         """
         response:
             [+] Available for all periods
@@ -139,29 +226,105 @@ class DataReader:
         parameters:
             chartReset, chartSimplify, chartInterval, changeFromClose,
             chartLast
+        columns:
+            list of responses, replaces response
+            The chart is fetched once and only these columns are built
+            straight from the JSON, use it instead of joinCol of several
+            chart calls
         Refer to iex.py for more details
         e.g.:
         >>> a = DataReader("aapl")
         # get date from chart
         >>> a.chart("date")
-        """
-        all_list = ["date", "label", "high", "low", "volume", "open", "close",
-                    "changeOverTime"]
-        one_day_list = ["minute", "average", "notional", "numberOfTrades",
-                        "marketHigh", "marketLow", "marketAverage",
-                        "marketVolume", "marketNotional",
-                        "marketNumberOfTrades", "marketOpen", "marketClose",
-                        "marketChangeOverTime"]
-        not_one_day_list = ["unadjustedVolume", "change", "changePercent",
-                            "vwap"]
-        if response in not_one_day_list:
+        # get several columns in 1 request
+        >>> a.chart(columns=["date", "open", "close"], period="1y")
+        # range picked by the dynamic period, '1d' or '1m'
+        >>> a.chart("close", "dynamic").attrs["range"]
+        """
+        if columns is not None:
+            return self._chart_columns(columns, period, parameter)
+        if response in self.CHART_NOT_ONE_DAY:
             df = self._chart_chk_not1d(period, parameter)
-        elif response in one_day_list:
+        elif response in self.CHART_ONE_DAY:
             df = self._chart_chk_1d(period, parameter)
-        elif response in all_list:
+        elif response in self.CHART_ALL:
             df = self._chart_chk_dynamic(period, parameter)
         if df is not None:
-            return df.loc[:, [response]]
+            column = df.loc[:, [response]]
+            column.attrs.update(df.attrs)
+            return column
+
+    def _chart_columns(self, columns, period, parameter):
+        """
+        Build only the given chart columns from 1 fetch
+        [+] Each column is read straight from the list of bars, the rest of
+            the payload is never converted
+        [+] None value will be given if a column is not available for the
+            period, same as chart
+        """
+        one_day = period == "1d" or (period is not None and len(period) == 8
+                                     and period.isdigit())
+        for column in columns:
+            if column in self.CHART_NOT_ONE_DAY:
+                if one_day or period is None:
+                    return None
+            elif column in self.CHART_ONE_DAY:
+                if not one_day:
+                    return None
+            elif column not in self.CHART_ALL:
+                raise ValueError(f"{column} is not a chart response")
+        import pandas as pd
+        from iex_frames import build_columns
+        data = self.stock_api.get_charts(period, parameter)
+        start = time.perf_counter()
+        multi = len(self.stock_api.symbols.split(",")) > 1
+        if not multi:
+            data = {self.stock_api.symbols: data}
+        frames = {}
+        ranges = {}
+        for symbol, bars in data.items():
+            if bars is None:
+                continue
+            if period == "dynamic":
+                ranges[symbol], bars = bars
+            frames[symbol] = build_columns(bars, columns, "chart")
+        if not multi:
+            df = frames[self.stock_api.symbols]
+            ranges = ranges.get(self.stock_api.symbols)
+        else:
+            df = pd.concat(frames, names=["symbol"])
+        if period == "dynamic":
+            df.attrs["range"] = ranges
+        df = self._typed(df, "chart")
+        metrics = self.stock_api.metrics
+        if metrics is not None:
+            metrics.observe("frame_seconds", "chart",
+                            time.perf_counter() - start)
+        return df
+
+    def history(self, start=None, end=None, columns=None, refresh=True):
+        """
+        Get daily chart history from the local store (iex_store.ChartStore)
+        start, end: first and last date to include, e.g.: "2018-01-31"
+        columns: chart fields to read, defaults to all stored fields
+        refresh: fetch the bars missing since the last stored bar first,
+                 with refresh=False the network is not touched
+        e.g.:
+        >>> a = DataReader("aapl", store=ChartStore("~/iex_charts"))
+        >>> test = a.history("2018-01-01", columns=["close", "volume"])
+        """
+        if self.store is None:
+            raise ValueError("history requires a store, e.g.: "
+                             "DataReader('aapl', store=ChartStore(path))")
+        if refresh:
+            self.store.refresh(self.stock_api)
+        symbols = self.stock_api.symbols.split(",")
+        frames = {symbol: self.store.read(symbol, start, end, columns)
+                  for symbol in symbols}
+        if len(symbols) == 1:
+            return frames[symbols[0]]
+        import pandas as pd
+        return pd.concat(frames, names=["symbol"])
 
     def dividends(self, period=None):
         """
@@ -183,10 +346,12 @@ class DataReader:
         >>> test[["amount", paymentDate]]
         """
         if period is None:
-            return self.table(self.stock_api.get_dividends(period))
+            return self.frame(self.stock_api.get_dividends(period),
+                              "dividends")
         period_list = ["5y", "2y", "1y", "ytd", "6m", "3m", "1m"]
         if period in period_list:
-            return self.table(self.stock_api.get_dividends(period))
+            return self.frame(self.stock_api.get_dividends(period),
+                              "dividends")
         else:
             raise ValueError("Only period range of '5y', '2y', '1y', 'ytd',"
                              "'6m', '3m', '1m' are supported")
@@ -210,7 +375,8 @@ class DataReader:
         # get multi columns
         >>> test[["grossProfit", "netIncome"]]
         """
-        return self.table(self.stock_api.get_financials(period))
+        return self.frame(self.stock_api.get_financials(period),
+                          endpoint="financials")
 
     def topTen(self, parameter):
         """
@@ -241,7 +407,8 @@ class DataReader:
         parameter_list = ["mostactive", "gainers", "losers", "iexvolume",
                           "iexpercent", "infocus"]
         if parameter in parameter_list:
-            return self.table(self.stock_api.get_topTen(parameter))
+            return self.frame(self.stock_api.get_topTen(parameter), "quote",
+                              keyed=False, endpoint="list")
 
     def news(self, latest=None):
         """
@@ -265,7 +432,7 @@ class DataReader:
         if latest is not None:
             if len(latest) > 2 or latest.isdigit() is False:
                 latest = None
-        return self.table(self.stock_api.get_news(latest))
+        return self.frame(self.stock_api.get_news(latest), endpoint="news")
 
     def batchNews(self, latest=None):
         """
@@ -289,7 +456,8 @@ class DataReader:
         if latest is not None:
             if len(latest) > 2 or latest.isdigit() is False:
                 latest = None
-        return self.table(self.stock_api.get_batchNews(latest))
+        return self.frame(self.stock_api.get_batchNews(latest), keyed=False,
+                          endpoint="news")
 
     def quote(self, percentage=False):
         """
@@ -317,7 +485,8 @@ class DataReader:
         >>> test[["symbol", "open"]]
         """
         if percentage is False or percentage is True:
-            return self.table(self.stock_api.get_quote(percentage))
+            return self.frame(self.stock_api.get_quote(percentage),
+                              "quote")
 
     def company(self):
         """
@@ -336,7 +505,7 @@ class DataReader:
         # get multi columns
         >>> test[["symbol", "companyName"]]
         """
-        return self.table(self.stock_api.get_company())
+        return self.frame(self.stock_api.get_company(), "company")
 
     def earnings(self):
         """
@@ -356,7 +525,7 @@ class DataReader:
         # get multi columns
         >>> test[["actualEPS", "fiscalPeriod"]]
         """
-        return self.table(self.stock_api.get_earnings())
+        return self.frame(self.stock_api.get_earnings(), endpoint="earnings")
 
     def stats(self):
         """
@@ -385,7 +554,7 @@ class DataReader:
         # get multi columns
         >>> test[["marketcap", "cash"]]
         """
-        return self.table(self.stock_api.get_stats())
+        return self.frame(self.stock_api.get_stats(), endpoint="stats")
 
     def largestTrades(self):
         """
@@ -403,7 +572,8 @@ class DataReader:
         # get multi columns
         >>> test[["price", "size"]]
         """
-        return self.table(self.stock_api.get_largestTrades())
+        return self.frame(self.stock_api.get_largestTrades(),
+                          "largest-trades")
 
     def volByVenue(self):
         """
@@ -421,7 +591,8 @@ class DataReader:
         # get multi columns
         >>> test[["venue", "marketPercent"]]
         """
-        return self.table(self.stock_api.get_volByVenue())
+        return self.frame(self.stock_api.get_volByVenue(),
+                          "volume-by-venue")
 
 
 if __name__ == "__main__":